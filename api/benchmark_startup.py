@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import subprocess
+
+# Worker cold-start benchmark: time and RSS of a fresh interpreter that
+# imports the API and then (optionally) loads every artifact. Each run is a
+# new process, like a new uvicorn worker.
+#
+#   python benchmark_startup.py
+
+REPEATS = 3
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STARTUP_SNIPPET = """
+import json, os, sys, time
+
+def current_rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+mode = sys.argv[1]
+start = time.perf_counter()
+import main
+import_seconds = time.perf_counter() - start
+
+import app_state
+if mode == "warm_up":
+    app_state.warm_up()
+elif mode == "first_request":
+    drug_ids = app_state.get("drugs")["drug_id"].dropna().unique().tolist()[:5]
+    main.compute_regimen_risk(drug_ids)
+
+print(json.dumps({
+    "import_seconds": import_seconds,
+    "total_seconds": time.perf_counter() - start,
+    "rss_mb": current_rss() / 1024 / 1024,
+    "loaded": len(app_state.status()["loaded"]),
+}))
+"""
+
+MODES = [
+    ("import only", "import"),
+    ("import + warm_up", "warm_up"),
+    ("import + 1st request", "first_request"),
+]
+
+
+def measure(mode):
+    best = None
+    for _ in range(REPEATS):
+        out = subprocess.run(
+            [sys.executable, "-c", STARTUP_SNIPPET, mode],
+            check=True, capture_output=True, text=True, cwd=API_DIR,
+            env=dict(os.environ, DDI_LAZY_LOAD="1"),
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or result["total_seconds"] < best["total_seconds"]:
+            best = result
+    return best
+
+
+def main():
+    print(f"{'mode':<22} {'import s':>9} {'total s':>8} {'RSS MB':>8} {'artifacts':>10}")
+    for label, mode in MODES:
+        r = measure(mode)
+        print(f"{label:<22} {r['import_seconds']:>9.3f} {r['total_seconds']:>8.3f} "
+              f"{r['rss_mb']:>8.1f} {r['loaded']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import sys
+import os
+import time
+import random
+import asyncio
+import httpx
+
+# Make sure Python can see the ../ml folder
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "ml"))
+if ML_PATH not in sys.path:
+    sys.path.append(ML_PATH)
+
+from table_store import read_table
+
+# Load test for a running API, e.g.
+#   DDI_SCORING_WORKERS=4 uvicorn main:app --port 8000
+#   python load_test.py http://127.0.0.1:8000
+# Sends a mix of /risk_score and /recommend_drug requests at each concurrency
+# level and reports throughput and latency percentiles.
+
+API_URL = "http://127.0.0.1:8000"
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+REQUESTS_PER_LEVEL = 200
+REGIMEN_SIZE = 6
+RECOMMEND_SHARE = 0.3  # fraction of requests that go to /recommend_drug
+
+drug_ids = read_table("drugs", columns=["drug_id"])["drug_id"].dropna().unique().tolist()
+
+
+def make_request(rng):
+    regimen = rng.sample(drug_ids, REGIMEN_SIZE)
+    if rng.random() < RECOMMEND_SHARE:
+        return "/recommend_drug", {"drug_ids": regimen, "target_drug": regimen[0]}
+    return "/risk_score", {"drug_ids": regimen, "age": rng.choice([None, 30, 70]), "sex": "F"}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+async def run_level(client, concurrency, n_requests, rng):
+    requests = [make_request(rng) for _ in range(n_requests)]
+    queue = asyncio.Queue()
+    for r in requests:
+        queue.put_nowait(r)
+    latencies, statuses = [], {}
+
+    async def worker():
+        while not queue.empty():
+            path, payload = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                status = (await client.post(path, json=payload)).status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return latencies, statuses, elapsed
+
+
+async def main(api_url):
+    rng = random.Random(42)
+    limits = httpx.Limits(max_connections=max(CONCURRENCY_LEVELS))
+    async with httpx.AsyncClient(base_url=api_url, timeout=60, limits=limits) as client:
+        (await client.get("/")).raise_for_status()
+        print(f"{'conc':>5} {'reqs':>5} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}  status counts")
+        for concurrency in CONCURRENCY_LEVELS:
+            latencies, statuses, elapsed = await run_level(client, concurrency, REQUESTS_PER_LEVEL, rng)
+            print(f"{concurrency:>5} {len(latencies):>5} {len(latencies) / elapsed:>8.1f} "
+                  f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f}  {statuses}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else API_URL))
@@ -7,16 +7,58 @@ ML_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "ml"))
 if ML_PATH not in sys.path:
     sys.path.append(ML_PATH)
 
+import json
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import Body
 from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import HTTPException
+from fastapi import Query
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 from typing import List
 from fastapi.middleware.cors import CORSMiddleware
-from risk_scoring import compute_regimen_risk
+from risk_scoring import PAIR_CACHE_SHARED, compute_regimen_risk, compute_regimens_risk, pair_cache_stats
 from recommendation_engine import recommend_alternatives
-import pandas as pd
+import app_state
+from graph_index import GRAPH_MAX_EDGES, GRAPH_MAX_NODES
+import graph_stats
+import gnn_topk
+from scoring_pool import PoolBusy, PoolTimeout, ScoringPool
 
-app = FastAPI(title="AI Drug Interaction & Safety API")
+NDJSON = "application/x-ndjson"
+BATCH_CHUNK = int(os.environ.get("DDI_BATCH_CHUNK", 1000))  # regimens per scoring call when streaming
+
+# CPU-bound scoring runs here, never on the event loop (see scoring_pool.py)
+scoring_pool = ScoringPool()
+
+# read-only artifacts behind /drug_stats and /interaction_partners
+graph_stats.register()
+gnn_topk.register()
+
+
+_warm_up_task = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load everything before forking scoring workers so they share it; with
+    # DDI_LAZY_LOAD=1 artifacts load on first use (or on the first /ready)
+    # and each scoring worker loads its own.
+    if not app_state.LAZY_LOAD:
+        load_seconds = app_state.warm_up()
+        print(f"Loaded {len(load_seconds)} artifacts in {sum(load_seconds.values()):.2f}s")
+    # always before forking: with DDI_PAIR_CACHE_SHARED=1 this starts the one
+    # cache manager every scoring worker talks to
+    app_state.get("pair_cache")
+    scoring_pool.start()
+    yield
+    scoring_pool.shutdown()
+
+
+app = FastAPI(title="AI Drug Interaction & Safety API", lifespan=lifespan)
 
 # CORS for dashboard + mobile app
 app.add_middleware(
@@ -27,35 +69,183 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load data for visualization
-drugs_df = pd.read_csv("../data_processed/kg_drugs.csv")
-interactions_df = pd.read_csv("../data_processed/kg_interactions.csv")
+# Data for visualization: app_state.get("graph_index") (built from kg_drugs + kg_interactions)
 
 class RiskRequest(BaseModel):
     drug_ids: List[str]
     age: int | None = None
     sex: str | None = None
 
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body is produced while the request body is still
+    being read. The stock one runs a disconnect listener that would consume
+    the request's body messages; here the body iterator reads them itself.
+    """
+    media_type = NDJSON
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+class BatchRiskRequest(BaseModel):
+    regimens: List[RiskRequest]
+
 class RecommendRequest(BaseModel):
     drug_ids: List[str]
+    target_drug: str
+
+
+async def run_scoring(fn, *args, **kwargs):
+    try:
+        return await scoring_pool.run(fn, *args, **kwargs)
+    except PoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except PoolTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
 
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "API is running"}
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once every artifact is loaded, else 503 (and start loading)."""
+    global _warm_up_task
+    if app_state.is_ready():
+        return app_state.status()
+    if _warm_up_task is None:
+        _warm_up_task = asyncio.create_task(asyncio.to_thread(app_state.warm_up))
+    raise HTTPException(status_code=503, detail=app_state.status())
+
+@app.get("/stats")
+async def stats():
+    """Scoring pool load and pair-cache counters."""
+    if PAIR_CACHE_SHARED:
+        scope = "shared"  # one cache for every scoring worker
+    elif scoring_pool.workers > 0:
+        scope = "worker"  # per-worker caches; these are the counters of whichever worker answered
+    else:
+        scope = "process"
+    return {
+        "scoring_pool": scoring_pool.stats(),
+        "pair_cache": {"scope": scope, **await run_scoring(pair_cache_stats)},
+    }
+
 @app.post("/risk_score")
-def risk_score(request: RiskRequest):
-    result = compute_regimen_risk(request.drug_ids, age=request.age, sex=request.sex)
+async def risk_score(request: RiskRequest):
+    result = await run_scoring(compute_regimen_risk, request.drug_ids, age=request.age, sex=request.sex)
     return {"risk": result}
 
+@app.post("/risk_score/batch")
+async def risk_score_batch(request: Request):
+    """
+    JSON body {"regimens": [RiskRequest, ...]} -> {"results": [{"risk": ...}, ...]}.
+    With Content-Type application/x-ndjson: one RiskRequest per line in, one
+    {"risk": ...} (or {"error": ...}) line per regimen out, streamed in
+    chunks of BATCH_CHUNK so the batch is never held in memory whole.
+    """
+    if request.headers.get("content-type", "").startswith(NDJSON):
+        return NDJSONStreamingResponse(stream_batch_results(request))
+
+    try:
+        batch = BatchRiskRequest.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    results = await run_scoring(compute_regimens_risk, [r.model_dump() for r in batch.regimens])
+    return {"results": [{"risk": r} for r in results]}
+
+async def iter_ndjson_lines(request):
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+async def score_ndjson_chunk(entries):
+    """entries: parsed regimen dicts, or error dicts for lines that did not parse."""
+    regimens = [e for e in entries if "error" not in e]
+    try:
+        results = iter(await run_scoring(compute_regimens_risk, regimens))
+    except HTTPException as e:
+        # the response has already started, so report it per line
+        results = iter([{"error": e.detail}] * len(regimens))
+    lines = []
+    for e in entries:
+        if "error" in e:
+            lines.append(json.dumps(e, default=str))
+        else:
+            result = next(results)
+            lines.append(json.dumps(result if "error" in result else {"risk": result}))
+    return "\n".join(lines) + "\n"
+
+async def stream_batch_results(request):
+    entries = []
+    async for line in iter_ndjson_lines(request):
+        try:
+            entries.append(RiskRequest.model_validate_json(line).model_dump())
+        except ValidationError as e:
+            entries.append({"error": e.errors(include_url=False)})
+        if len(entries) >= BATCH_CHUNK:
+            yield await score_ndjson_chunk(entries)
+            entries = []
+    if entries:
+        yield await score_ndjson_chunk(entries)
+
 @app.post("/recommend_drug")
-def recommend(request: RecommendRequest):
-    recs = recommend_alternatives(request.drug_ids, request.target_drug)
+async def recommend(request: RecommendRequest):
+    recs = await run_scoring(recommend_alternatives, request.drug_ids, request.target_drug)
     return {"recommendations": recs}
 
+@app.get("/drug_stats/{drug_id}")
+async def drug_stats(drug_id: str):
+    """Interaction degree and neighbourhood statistics of one drug (graph_stats.py)."""
+    lookup = app_state.get("graph_stats")
+    if lookup is None:
+        raise HTTPException(status_code=503, detail="graph_stats is not available; run graph_stats.py")
+    stats = lookup.lookup(drug_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"{drug_id} is not in the interaction graph")
+    return stats
+
+@app.get("/interaction_partners/{drug_id}")
+async def interaction_partners(
+    drug_id: str,
+    kind: str = Query("high", pattern="^(high|low)$"),
+    k: int = Query(10, ge=1),
+):
+    """Highest- or lowest-risk partners of one drug from the GNN top-k index (gnn_topk.py)."""
+    index = app_state.get("gnn_topk")
+    if index is None:
+        raise HTTPException(status_code=503, detail="GNN partner index is not available; run train_gnn.py")
+    partners = index.partners(drug_id, kind, k)
+    if partners is None:
+        raise HTTPException(status_code=404, detail=f"{drug_id} is not in the GNN graph")
+    return {"drug_id": drug_id, "kind": kind, "partners": partners}
+
+@app.get("/interaction_graph")
+async def interaction_graph(
+    drug_ids: List[str] | None = Query(None),
+    hops: int = Query(0, ge=0, le=3),
+    max_nodes: int = GRAPH_MAX_NODES,
+    max_edges: int = GRAPH_MAX_EDGES,
+    offset: int = Query(0, ge=0),
+):
+    """Subgraph around drug_ids (default: the most connected drugs), see graph_index.py."""
+    graph_index = app_state.get("graph_index")
+    return graph_index.subgraph(drug_ids, hops, max_nodes, max_edges, offset)
+
 @app.post("/interaction_graph")
-def interaction_graph(
-    drug_ids: List[str] = Body(...)
+async def interaction_graph_for(
+    drug_ids: List[str] = Body(...),
+    hops: int = Query(0, ge=0, le=3),
+    max_nodes: int = GRAPH_MAX_NODES,
+    max_edges: int = GRAPH_MAX_EDGES,
+    offset: int = Query(0, ge=0),
 ):
-    return build_graph(drug_ids)
+    graph_index = app_state.get("graph_index")
+    return graph_index.subgraph(drug_ids, hops, max_nodes, max_edges, offset)
@@ -0,0 +1,82 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Runs CPU-bound scoring off the event loop.
+#
+# With DDI_SCORING_WORKERS > 0 calls go to a process pool. Workers are forked
+# after the model and indexes are loaded, so they share them copy-on-write
+# instead of loading their own. With 0 they run on the default thread pool,
+# as the old sync handlers did. Calls beyond DDI_MAX_PENDING in flight are
+# rejected (load shedding), and a call that takes longer than
+# DDI_SCORING_TIMEOUT seconds is abandoned; it keeps its pending slot until
+# the work actually finishes.
+
+SCORING_WORKERS = int(os.environ.get("DDI_SCORING_WORKERS", 0))
+SCORING_TIMEOUT = float(os.environ.get("DDI_SCORING_TIMEOUT", 10))
+MAX_PENDING = int(os.environ.get("DDI_MAX_PENDING", 64))
+
+
+class PoolBusy(Exception):
+    pass
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ScoringPool:
+    def __init__(self, workers=SCORING_WORKERS, timeout=SCORING_TIMEOUT, max_pending=MAX_PENDING):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.pending = 0  # calls still running; only touched from the event loop thread
+        self.executor = None
+
+    def start(self):
+        if self.workers <= 0:
+            return
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("fork"),
+        )
+        # fork every worker now, at startup, rather than under load
+        for future in [self.executor.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) in the pool; raises PoolBusy / PoolTimeout."""
+        if self.pending >= self.max_pending:
+            raise PoolBusy(f"{self.pending} scoring calls already pending")
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        # the slot is released when the work is really done: on timeout the
+        # worker still finishes the call (the result is dropped) and keeps
+        # counting against max_pending until then
+        self.pending += 1
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f"scoring took longer than {self.timeout}s")
+
+    def _release(self, future):
+        self.pending -= 1
+        if not future.cancelled():
+            future.exception()  # retrieved, so an abandoned call's error is not logged as unhandled
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "timeout": self.timeout,
+        }
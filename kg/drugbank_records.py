@@ -0,0 +1,176 @@
+from drugbank_stream import strip_tag
+
+# Per-drug field extraction shared by parse_drugbank.py,
+# extract_interactions_from_xml.py and extract_drugbank.py.
+# Tag names are namespace-qualified once (DrugBankTags) and compared as plain
+# strings, instead of calling strip_tag on every element.
+
+class DrugBankTags:
+    """Fully qualified DrugBank tag names for one XML namespace."""
+
+    def __init__(self, namespace=""):
+        ns = "{" + namespace + "}" if namespace else ""
+        self.drugbank_id = ns + "drugbank-id"
+        self.name = ns + "name"
+        self.groups = ns + "groups"
+        self.group = ns + "group"
+        self.categories = ns + "categories"
+        self.category = ns + "category"
+        self.indication = ns + "indication"
+        self.drug_interactions = ns + "drug-interactions"
+        self.drug_interaction = ns + "drug-interaction"
+        self.description = ns + "description"
+        self.synonyms = ns + "synonyms"
+        self.synonym = ns + "synonym"
+        self.international_brands = ns + "international-brands"
+        self.international_brand = ns + "international-brand"
+        self.salts = ns + "salts"
+        self.salt = ns + "salt"
+        self.products = ns + "products"
+        self.product = ns + "product"
+
+    @classmethod
+    def for_element(cls, elem):
+        """Build tags using the namespace of elem, e.g. a <drug> element."""
+        tag = elem.tag
+        if tag.startswith("{"):
+            return cls(tag[1:tag.index("}")])
+        return cls()
+
+
+_tags_cache = {}
+
+def tags_for(drug):
+    """DrugBankTags for this drug's namespace (cached, normally only one)."""
+    namespace = drug.tag[:-len(strip_tag(drug.tag))]
+    tags = _tags_cache.get(namespace)
+    if tags is None:
+        tags = _tags_cache[namespace] = DrugBankTags.for_element(drug)
+    return tags
+
+def guess_severity(description: str) -> str:
+    """Very rough heuristic based on text."""
+    if not description:
+        return ""
+    desc_low = description.lower()
+    if "life-threatening" in desc_low or "contraindicated" in desc_low or "severe" in desc_low:
+        return "severe"
+    if "monitor" in desc_low or "increase" in desc_low or "decrease" in desc_low or "adjust" in desc_low:
+        return "moderate"
+    return "unknown"
+
+def drug_record(drug, tags):
+    """Row for drugs.csv, or None if the drug has no primary id or name."""
+    drug_type = drug.attrib.get("type", "")
+
+    drug_id = None
+    name = ""
+    groups = []
+    categories = []
+    indication = ""
+
+    for child in drug:
+        tag = child.tag
+
+        if tag == tags.drugbank_id:
+            # pick primary ID
+            if child.attrib.get("primary") == "true":
+                drug_id = (child.text or "").strip()
+
+        elif tag == tags.name:
+            name = (child.text or "").strip()
+
+        elif tag == tags.groups:
+            for g in child:
+                if g.tag == tags.group and g.text:
+                    groups.append(g.text.strip())
+
+        elif tag == tags.categories:
+            # nested categories/category/category
+            for cat in child:
+                if cat.tag == tags.category:
+                    for c2 in cat:
+                        if c2.tag == tags.category and c2.text:
+                            categories.append(c2.text.strip())
+
+        elif tag == tags.indication:
+            indication = (child.text or "").strip()
+
+    # Only save if we have at least an ID and name
+    if not (drug_id and name):
+        return None
+    return {
+        "drug_id": drug_id,
+        "name": name,
+        "type": drug_type,
+        "drug_class": "; ".join(categories) if categories else "; ".join(groups),
+        "indication": indication
+    }
+
+def primary_drug_id(drug, tags):
+    for child in drug:
+        if child.tag == tags.drugbank_id and child.attrib.get("primary") == "true":
+            return (child.text or "").strip()
+    return None
+
+def _child_text(elem, tag):
+    for child in elem:
+        if child.tag == tag:
+            return (child.text or "").strip()
+    return ""
+
+def name_records(drug, main_id, tags):
+    """
+    Rows for the drug_names table: every name a drug is known by (its own
+    name, synonyms, international brands, salts and product names), used by
+    ml/name_resolver.py to match FAERS drug strings.
+    """
+    if not main_id:
+        return []
+    names = []
+    for child in drug:
+        tag = child.tag
+        if tag == tags.name:
+            names.append(((child.text or "").strip(), "name"))
+        elif tag == tags.synonyms:
+            names.extend(((s.text or "").strip(), "synonym") for s in child if s.tag == tags.synonym)
+        elif tag == tags.international_brands:
+            names.extend(
+                (_child_text(b, tags.name), "brand") for b in child if b.tag == tags.international_brand
+            )
+        elif tag == tags.salts:
+            names.extend((_child_text(s, tags.name), "salt") for s in child if s.tag == tags.salt)
+        elif tag == tags.products:
+            names.extend((_child_text(p, tags.name), "product") for p in child if p.tag == tags.product)
+    return [{"drug_id": main_id, "name": n, "source": source} for n, source in names if n]
+
+def interaction_records(drug, main_id, tags):
+    """Rows for known_interactions.csv listed under one drug."""
+    interactions = []
+    for child in drug:
+        if child.tag != tags.drug_interactions:
+            continue
+        for di in child:
+            if di.tag != tags.drug_interaction:
+                continue
+
+            other_id = ""
+            description = ""
+            for di_child in di:
+                if di_child.tag == tags.drugbank_id:
+                    other_id = (di_child.text or "").strip()
+                elif di_child.tag == tags.description:
+                    description = (di_child.text or "").strip()
+
+            if main_id and other_id:
+                severity = guess_severity(description)
+                # normalize pair order (so (A,B) and (B,A) count once)
+                a, b = sorted([main_id, other_id])
+                interactions.append({
+                    "drug1_id": a,
+                    "drug2_id": b,
+                    "severity": severity,
+                    "description": description,
+                    "source": "DrugBank"
+                })
+    return interactions
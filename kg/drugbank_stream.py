@@ -0,0 +1,38 @@
+import xml.etree.ElementTree as ET
+
+# Path to your DrugBank XML file (relative to the scripts in kg/)
+DRUGBANK_FILE = "../data_raw/drugbank/drugbank.xml"
+
+def strip_tag(tag):
+    """Remove XML namespace, e.g. '{http://www.drugbank.ca}drug' -> 'drug'."""
+    if '}' in tag:
+        return tag.split('}', 1)[1]
+    return tag
+
+def iter_drugs(path=DRUGBANK_FILE):
+    """
+    Stream the top-level <drug> elements of a DrugBank XML file one at a time.
+
+    Uses iterparse instead of ET.parse, so the full tree (1.5 GB+ for a full
+    release) is never held in memory. Each <drug> is complete when it is
+    yielded; once the caller asks for the next one, the finished element is
+    cleared from the root, so peak memory stays at roughly one drug entry.
+    Nested <drug> elements (e.g. inside <pathways>) are not yielded.
+    """
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 1:
+            continue
+
+        # elem is a direct child of <drugbank>
+        if strip_tag(elem.tag) == "drug":
+            yield elem
+        root.clear()
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+
+# Make sure Python can see the ../ml folder (shared table storage)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "ml"))
+if ML_PATH not in sys.path:
+    sys.path.append(ML_PATH)
+
+import pandas as pd
+from drugbank_stream import DRUGBANK_FILE, iter_drugs
+from drugbank_records import drug_record, interaction_records, name_records, primary_drug_id, tags_for
+from table_store import write_table
+
+# One pass over drugbank.xml producing both drug nodes (drugs.csv) and
+# interaction edges (known_interactions.csv). Rows are identical to running
+# parse_drugbank.py and extract_interactions_from_xml.py separately. The same
+# pass collects every name of each drug (synonyms, brands, salts, products)
+# into drug_names, for ml/name_resolver.py.
+
+PROGRESS_EVERY = 1000  # drugs between throughput reports
+
+def extract_drugbank(limit=None):
+    print(f"Streaming XML from: {DRUGBANK_FILE}")
+
+    drugs_data = []
+    interactions = []
+    names = []
+    count = 0
+    start = time.perf_counter()
+
+    for drug in iter_drugs(DRUGBANK_FILE):
+        tags = tags_for(drug)
+
+        record = drug_record(drug, tags)
+        if record is not None:
+            drugs_data.append(record)
+
+        main_id = primary_drug_id(drug, tags)
+        if main_id:
+            interactions.extend(interaction_records(drug, main_id, tags))
+            names.extend(name_records(drug, main_id, tags))
+
+        count += 1
+        if count % PROGRESS_EVERY == 0:
+            elapsed = time.perf_counter() - start
+            print(f"  {count} drugs, {count / elapsed:.0f} drugs/sec")
+        if limit is not None and count >= limit:
+            break
+
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Parsed {count} drugs in {elapsed:.1f}s ({rate:.0f} drugs/sec)")
+
+    drugs_df = pd.DataFrame(drugs_data)
+    interactions_df = pd.DataFrame(interactions)
+    print(f"Drug nodes: {len(drugs_df)}")
+    print(f"Collected {len(interactions_df)} raw interaction rows")
+    if not interactions_df.empty:
+        # Drop duplicates of same pair
+        interactions_df = interactions_df.drop_duplicates(subset=["drug1_id", "drug2_id", "description"])
+    print(f"After deduplication: {len(interactions_df)} interactions")
+    names_df = pd.DataFrame(names, columns=["drug_id", "name", "source"]).drop_duplicates()
+    print(f"Drug names (incl. synonyms, brands, salts, products): {len(names_df)}")
+    return drugs_df, interactions_df, names_df
+
+def main():
+    drugs_df, interactions_df, names_df = extract_drugbank(limit=None)
+
+    print(f"Saved {write_table(drugs_df, 'drugs')}")
+    print(f"Saved {write_table(interactions_df, 'known_interactions')}")
+    print(f"Saved {write_table(names_df, 'drug_names')}")
+
+if __name__ == "__main__":
+    main()
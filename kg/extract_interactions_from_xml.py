@@ -1,75 +1,45 @@
-import xml.etree.ElementTree as ET
+import os
+import sys
+import hashlib
+from multiprocessing import Pool
+
+# Make sure Python can see the ../ml folder (shared table storage)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "ml"))
+if ML_PATH not in sys.path:
+    sys.path.append(ML_PATH)
+
 import pandas as pd
+from drugbank_stream import DRUGBANK_FILE, iter_drugs
+from drugbank_records import interaction_records, primary_drug_id, tags_for
+from table_store import write_table
 
-DRUGBANK_FILE = "../data_raw/drugbank/drugbank.xml"
-
-def strip_tag(tag):
-    """Remove XML namespace, e.g. '{http://www.drugbank.ca}drug' -> 'drug'."""
-    if '}' in tag:
-        return tag.split('}', 1)[1]
-    return tag
-
-def guess_severity(description: str) -> str:
-    """Very rough heuristic based on text."""
-    if not description:
-        return ""
-    desc_low = description.lower()
-    if "life-threatening" in desc_low or "contraindicated" in desc_low or "severe" in desc_low:
-        return "severe"
-    if "monitor" in desc_low or "increase" in desc_low or "decrease" in desc_low or "adjust" in desc_low:
-        return "moderate"
-    return "unknown"
+# Parallel mode: the file is cut into shards of about SHARD_BYTES at top-level
+# <drug> boundaries and NUM_WORKERS processes parse them independently.
+NUM_WORKERS = os.cpu_count() or 1
+SHARD_BYTES = 64 * 1024 * 1024
+# DrugBank writes top-level <drug> elements unindented at the start of a line;
+# nested <drug> elements (pathways etc.) are always indented.
+DRUG_START = b"\n<drug "
+ROOT_END = b"</drugbank>"
+
+OUTPUT_COLUMNS = ["drug1_id", "drug2_id", "severity", "description", "source"]
 
 def parse_interactions(limit_drugs=None):
-    print(f"Loading XML from: {DRUGBANK_FILE}")
-    tree = ET.parse(DRUGBANK_FILE)
-    root = tree.getroot()
+    print(f"Streaming XML from: {DRUGBANK_FILE}")
 
     interactions = []
     drug_count = 0
 
-    for drug in root:
-        if strip_tag(drug.tag) != "drug":
-            continue
+    for drug in iter_drugs(DRUGBANK_FILE):
+        tags = tags_for(drug)
 
         # Get main drug ID (primary)
-        main_id = None
-        for child in drug:
-            tag = strip_tag(child.tag)
-            if tag == "drugbank-id" and child.attrib.get("primary") == "true":
-                main_id = (child.text or "").strip()
-                break
-
+        main_id = primary_drug_id(drug, tags)
         if not main_id:
             continue
 
-        # Find <drug-interactions>
-        for child in drug:
-            if strip_tag(child.tag) == "drug-interactions":
-                for di in child:
-                    if strip_tag(di.tag) != "drug-interaction":
-                        continue
-
-                    other_id = ""
-                    description = ""
-                    for di_child in di:
-                        di_tag = strip_tag(di_child.tag)
-                        if di_tag == "drugbank-id":
-                            other_id = (di_child.text or "").strip()
-                        elif di_tag == "description":
-                            description = (di_child.text or "").strip()
-
-                    if main_id and other_id:
-                        severity = guess_severity(description)
-                        # normalize pair order (so (A,B) and (B,A) count once)
-                        a, b = sorted([main_id, other_id])
-                        interactions.append({
-                            "drug1_id": a,
-                            "drug2_id": b,
-                            "severity": severity,
-                            "description": description,
-                            "source": "DrugBank"
-                        })
+        interactions.extend(interaction_records(drug, main_id, tags))
 
         drug_count += 1
         if limit_drugs is not None and drug_count >= limit_drugs:
@@ -84,15 +54,146 @@ def parse_interactions(limit_drugs=None):
     print(f"After deduplication: {len(df)} interactions")
     return df
 
+def interaction_key(drug1_id, drug2_id, description):
+    """Hash of the normalized pair + description, used for deduplication."""
+    text = f"{drug1_id}\t{drug2_id}\t{description}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+class ShardReader:
+    """
+    File-like object presenting bytes [start, end) of the XML as a complete
+    document: the original header (XML declaration + <drugbank ...> tag),
+    the shard's <drug> elements, then a closing </drugbank>.
+    """
+
+    def __init__(self, path, header, start, end):
+        self.parts = [header]
+        self.file = open(path, "rb")
+        self.file.seek(start)
+        self.remaining = end - start
+        self.footer = b"\n" + ROOT_END + b"\n"
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = 1 << 20
+        if self.parts:
+            return self.parts.pop()
+        if self.remaining > 0:
+            data = self.file.read(min(size, self.remaining))
+            self.remaining -= len(data)
+            if data:
+                return data
+            self.remaining = 0
+        data, self.footer = self.footer, b""
+        if not data:
+            self.file.close()
+        return data
+
+def _next_drug_start(f, offset, end):
+    """Offset of the first top-level <drug> at or after offset (or end)."""
+    # start one byte early so a <drug> beginning exactly at offset is found
+    pos = max(offset - 1, 0)
+    f.seek(pos)
+    overlap = b""
+    while pos < end:
+        chunk = f.read(1 << 20)
+        if not chunk:
+            break
+        data = overlap + chunk
+        found = data.find(DRUG_START)
+        if found != -1:
+            return pos - len(overlap) + found + 1
+        overlap = data[-(len(DRUG_START) - 1):]
+        pos += len(chunk)
+    return end
+
+def find_shards(path, shard_bytes=SHARD_BYTES):
+    """
+    Split the file into (start, end) byte ranges that each hold whole
+    top-level <drug> elements. Returns (header_bytes, shards).
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        # </drugbank> is the last thing in the file
+        f.seek(max(size - 4096, 0))
+        tail = f.read()
+        end = max(size - 4096, 0) + tail.rfind(ROOT_END)
+
+        first = _next_drug_start(f, 0, end)
+        f.seek(0)
+        header = f.read(first)
+
+        starts = [first]
+        offset = first + shard_bytes
+        while offset < end:
+            start = _next_drug_start(f, offset, end)
+            if start >= end:
+                break
+            starts.append(start)
+            offset = start + shard_bytes
+
+    shards = list(zip(starts, starts[1:] + [end]))
+    return header, shards
+
+def _parse_shard(args):
+    path, header, start, end = args
+    rows = []
+    seen = set()
+    for drug in iter_drugs(ShardReader(path, header, start, end)):
+        tags = tags_for(drug)
+        main_id = primary_drug_id(drug, tags)
+        if not main_id:
+            continue
+        for r in interaction_records(drug, main_id, tags):
+            key = interaction_key(r["drug1_id"], r["drug2_id"], r["description"])
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.append((key, tuple(r[c] for c in OUTPUT_COLUMNS)))
+    return rows
+
+def parse_interactions_parallel(num_workers=NUM_WORKERS, shard_bytes=SHARD_BYTES):
+    """
+    Same output as parse_interactions(limit_drugs=None), computed by worker
+    processes over byte-range shards of the XML. Shards are merged in file
+    order and deduplicated on a hash of (drug1_id, drug2_id, description),
+    so only the hashes are kept in memory for deduplication.
+    """
+    print(f"Streaming XML from: {DRUGBANK_FILE} with {num_workers} workers")
+    header, shards = find_shards(DRUGBANK_FILE, shard_bytes)
+    print(f"Split into {len(shards)} shards")
+
+    seen = set()
+    rows = []
+    raw_count = 0
+    tasks = [(DRUGBANK_FILE, header, start, end) for start, end in shards]
+    with Pool(num_workers) as pool:
+        for shard_rows in pool.imap(_parse_shard, tasks):
+            raw_count += len(shard_rows)
+            for key, row in shard_rows:
+                if key in seen:
+                    continue
+                seen.add(key)
+                rows.append(row)
+
+    print(f"Collected {raw_count} interaction rows (deduplicated within shards)")
+    df = pd.DataFrame(rows, columns=OUTPUT_COLUMNS)
+    print(f"After deduplication: {len(df)} interactions")
+    return df
+
 def main():
-    # First run with a limit just to test quickly
-    df = parse_interactions(limit_drugs=300)  # change to None later for full run
+    # Streaming keeps memory flat, so process every drug by default.
+    # Pass e.g. limit_drugs=300 for a quick test run.
+    if NUM_WORKERS > 1:
+        df = parse_interactions_parallel()
+    else:
+        df = parse_interactions(limit_drugs=None)
 
     print("Sample interactions:")
     print(df.head())
 
-    df.to_csv("../data_processed/known_interactions.csv", index=False)
-    print("Saved to ../data_processed/known_interactions.csv")
+    path = write_table(df, "known_interactions")
+    print(f"Saved to {path}")
 
 if __name__ == "__main__":
     main()
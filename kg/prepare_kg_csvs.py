@@ -1,23 +1,30 @@
-import pandas as pd
+import os
+import sys
+
+# Make sure Python can see the ../ml folder (shared table storage)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "ml"))
+if ML_PATH not in sys.path:
+    sys.path.append(ML_PATH)
+
+from table_store import read_table, write_table
 
 def prepare_drug_nodes():
-    df = pd.read_csv("../data_processed/drugs.csv")
+    df = read_table("drugs")
     # Keep only columns that exist
     wanted_cols = ["drug_id", "name", "type", "drug_class", "indication"]
     cols = [c for c in wanted_cols if c in df.columns]
     df_nodes = df[cols].copy()
     print("Drug nodes:", len(df_nodes))
-    df_nodes.to_csv("../data_processed/kg_drugs.csv", index=False)
-    print("Saved ../data_processed/kg_drugs.csv")
+    print(f"Saved {write_table(df_nodes, 'kg_drugs')}")
 
 def prepare_interaction_edges():
-    df = pd.read_csv("../data_processed/known_interactions.csv")
+    df = read_table("known_interactions")
     wanted_cols = ["drug1_id", "drug2_id", "severity", "description", "source"]
     cols = [c for c in wanted_cols if c in df.columns]
     df_edges = df[cols].copy()
     print("Interaction edges:", len(df_edges))
-    df_edges.to_csv("../data_processed/kg_interactions.csv", index=False)
-    print("Saved ../data_processed/kg_interactions.csv")
+    print(f"Saved {write_table(df_edges, 'kg_interactions')}")
 
 def main():
     prepare_drug_nodes()
@@ -0,0 +1,102 @@
+import os
+import time
+import threading
+import joblib
+from table_store import read_table
+from severity_table import CLASS_ENCODER_FILE, SEVERITY_ENCODER_FILE
+
+# Shared application state for the serving path (risk_scoring,
+# recommendation_engine, the API).
+#
+# Every artifact - model, encoders, tables, lookup indexes - is loaded by one
+# registered loader, at most once per process, and then shared by every module
+# that asks for it with get(name). Nothing is read at import time: artifacts
+# load on first use, or all at once through warm_up() (what the API does at
+# startup unless DDI_LAZY_LOAD=1). Paths come from table_store.DATA_DIR, which
+# DDI_DATA_DIR overrides.
+
+LAZY_LOAD = os.environ.get("DDI_LAZY_LOAD", "0") == "1"
+
+_loaders = {}
+_values = {}
+_load_seconds = {}
+_lock = threading.RLock()  # loaders may get() their dependencies
+
+
+def loader(name):
+    """Decorator registering the function that loads artifact `name`."""
+    def register(fn):
+        _loaders[name] = fn
+        return fn
+    return register
+
+
+def get(name):
+    try:
+        return _values[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name not in _values:
+            if name not in _loaders:
+                raise Exception(f"No loader registered for {name!r}")
+            start = time.perf_counter()
+            _values[name] = _loaders[name]()
+            _load_seconds[name] = time.perf_counter() - start
+        return _values[name]
+
+
+def warm_up(names=None):
+    """Load the given (default: all registered) artifacts; returns load times."""
+    for name in names or list(_loaders):
+        get(name)
+    return dict(_load_seconds)
+
+
+def is_ready(names=None):
+    return all(name in _values for name in names or _loaders)
+
+
+def reset(names=None):
+    """Forget loaded artifacts so the next get() reads them again."""
+    with _lock:
+        for name in names or list(_values):
+            _values.pop(name, None)
+            _load_seconds.pop(name, None)
+
+
+def status():
+    return {
+        "ready": is_ready(),
+        "loaded": sorted(_values),
+        "pending": sorted(set(_loaders) - set(_values)),
+        "load_seconds": {k: round(v, 4) for k, v in _load_seconds.items()},
+    }
+
+
+# Artifacts shared by several modules; module-specific indexes register their
+# loaders next to the code that uses them.
+
+@loader("drugs")
+def load_drugs():
+    return read_table("drugs", columns=["drug_id", "drug_class"])
+
+
+@loader("class_encoder")
+def load_class_encoder():
+    return joblib.load(CLASS_ENCODER_FILE)
+
+
+@loader("severity_encoder")
+def load_severity_encoder():
+    return joblib.load(SEVERITY_ENCODER_FILE)
+
+
+@loader("kg_drugs")
+def load_kg_drugs():
+    return read_table("kg_drugs", columns=["drug_id", "name", "drug_class"])
+
+
+@loader("kg_interactions")
+def load_kg_interactions():
+    return read_table("kg_interactions", columns=["drug1_id", "drug2_id", "severity"])
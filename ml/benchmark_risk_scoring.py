@@ -0,0 +1,88 @@
+import itertools
+import time
+import random
+import joblib
+import pandas as pd
+import app_state
+from risk_scoring import (
+    PAIR_SCORER,
+    compute_regimen_risk,
+    pair_cache_stats,
+    score_pairs_uncached,
+)
+from severity_table import MODEL_FILE
+from table_store import read_table
+
+# Regimen sizes to benchmark (number of drugs per regimen)
+REGIMEN_SIZES = [2, 5, 10, 15, 20, 25, 30]
+REPEATS = 3
+
+drugs_df = read_table("drugs", columns=["drug_id"])
+all_drug_ids = drugs_df["drug_id"].dropna().unique().tolist()
+
+
+# the RandomForest itself, whatever the pair scorer serves from
+rf_model = joblib.load(MODEL_FILE)
+
+
+def rf_pairs_one_by_one(drug_ids):
+    """Original behaviour: RandomForest predict + predict_proba on one row per pair."""
+    class_code = app_state.get("drug_class_index").class_code
+    severity_encoder = app_state.get("severity_encoder")
+    labels = []
+    for d1, d2 in itertools.combinations(drug_ids, 2):
+        X = pd.DataFrame([[class_code(d1), class_code(d2)]], columns=["class1_enc", "class2_enc"])
+        y_pred = rf_model.predict(X)[0]
+        rf_model.predict_proba(X)
+        labels.append(severity_encoder.inverse_transform([y_pred])[0])
+    return labels
+
+
+def score_pairs_one_by_one(drug_ids):
+    """One uncached pair-scorer call (severity table / GNN) per pair."""
+    return [score_pairs_uncached([pair])[0][0] for pair in itertools.combinations(drug_ids, 2)]
+
+
+def score_regimen_cold(drug_ids):
+    app_state.get("pair_cache").clear()
+    return compute_regimen_risk(drug_ids)
+
+
+def time_call(fn, drug_ids):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        fn(drug_ids)
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'drugs':>5} {'pairs':>5} {'RF per-pair ms':>15} {'per-pair ms':>12} "
+          f"{'batched ms':>11} {'speedup':>8} {'cached ms':>10}")
+
+    for n in REGIMEN_SIZES:
+        if n > len(all_drug_ids):
+            break
+        drug_ids = rng.sample(all_drug_ids, n)
+
+        # sanity check: the paths must give the same labels
+        batched = [d["severity"] for d in compute_regimen_risk(drug_ids)["details"]]
+        one_by_one = [str(label) for label in score_pairs_one_by_one(drug_ids)]
+        assert batched == one_by_one, "batched scoring differs from per-pair scoring"
+        if PAIR_SCORER == "rf":
+            rf = [str(label) for label in rf_pairs_one_by_one(drug_ids)]
+            assert batched == rf, "batched scoring differs from the RandomForest"
+
+        rf_ms = time_call(rf_pairs_one_by_one, drug_ids)
+        old_ms = time_call(score_pairs_one_by_one, drug_ids)
+        new_ms = time_call(score_regimen_cold, drug_ids)
+        cached_ms = time_call(compute_regimen_risk, drug_ids)  # warm pair cache
+        n_pairs = n * (n - 1) // 2
+        print(f"{n:>5} {n_pairs:>5} {rf_ms:>15.2f} {old_ms:>12.2f} {new_ms:>11.2f} "
+              f"{rf_ms / new_ms:>7.1f}x {cached_ms:>10.2f}")
+
+    print("Pair cache:", pair_cache_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import subprocess
+import tempfile
+import table_store
+from table_store import read_table, TABLES
+
+# Compare load time and memory of CSV vs Parquet for each processed table.
+# Every load runs in a fresh interpreter so the RSS growth (Linux
+# /proc/self/statm) is not polluted by earlier loads. Tables are copied into
+# a temp dir in both formats first.
+
+REPEATS = 3
+
+# Column subsets real consumers ask for
+CONSUMER_COLUMNS = {
+    "drugs": ["drug_id", "drug_class"],
+    "kg_interactions": ["drug1_id", "drug2_id", "severity"],
+    "training_data": ["class1", "class2", "severity"],
+}
+
+LOAD_SNIPPET = """
+import json, os, sys, time
+import pandas as pd
+
+def current_rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+path, fmt, columns = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+if fmt == "parquet":
+    import pyarrow.parquet  # import cost is paid once per process, not per load
+base = current_rss()
+start = time.perf_counter()
+if fmt == "parquet":
+    df = pd.read_parquet(path, columns=columns)
+else:
+    df = pd.read_csv(path, usecols=columns)
+elapsed = time.perf_counter() - start
+rss = current_rss()
+print(json.dumps({"seconds": elapsed, "rss_mb": (rss - base) / 1024 / 1024, "rows": len(df)}))
+"""
+
+
+def measure(path, fmt, columns):
+    best = None
+    for _ in range(REPEATS):
+        out = subprocess.run(
+            [sys.executable, "-c", LOAD_SNIPPET, path, fmt, json.dumps(columns)],
+            check=True, capture_output=True, text=True,
+        )
+        result = json.loads(out.stdout)
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def main():
+    if table_store.pyarrow is None:
+        print("pyarrow is not installed; nothing to compare.")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'table':<20} {'columns':<8} {'format':<8} {'size MB':>8} {'load ms':>9} {'RSS MB':>8}")
+        for name in TABLES:
+            try:
+                df = read_table(name)
+            except FileNotFoundError:
+                continue
+
+            original_dir = table_store.DATA_DIR
+            table_store.DATA_DIR = tmp
+            try:
+                csv_path = table_store.write_table(df, name, fmt="csv")
+                parquet_path = table_store.write_table(df, name, fmt="parquet")
+            finally:
+                table_store.DATA_DIR = original_dir
+
+            column_sets = [("all", None)]
+            if name in CONSUMER_COLUMNS:
+                column_sets.append(("subset", CONSUMER_COLUMNS[name]))
+
+            for label, columns in column_sets:
+                for fmt, path in [("csv", csv_path), ("parquet", parquet_path)]:
+                    r = measure(path, fmt, columns)
+                    size_mb = os.path.getsize(path) / 1024 / 1024
+                    print(f"{name:<20} {label:<8} {fmt:<8} {size_mb:>8.2f} "
+                          f"{r['seconds'] * 1000:>9.1f} {r['rss_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,67 @@
+import time
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import LabelEncoder
 import torch
 from torch_geometric.data import Data
 import joblib
+from table_store import read_table
+from graph_stats import GraphStats, load_graph_stats
+
+# Builds gnn_data.pt (node features, positive edges, sampled negative edges)
+# from kg_drugs / kg_interactions. Everything works on integer edge arrays:
+# an edge (i, j) is the int64 key i * num_nodes + j, so deduplication and
+# membership tests are np.unique / np.searchsorted instead of Python sets.
+
+NEG_SEED = 42
+NEG_BATCH_FACTOR = 1.2  # oversample each batch to make up for rejected draws
+
+stage_seconds = {}
+_stage_start = time.perf_counter()
+
+def end_stage(name):
+    """Record the time since the previous stage ended."""
+    global _stage_start
+    now = time.perf_counter()
+    stage_seconds[name] = now - _stage_start
+    _stage_start = now
+
+def sample_negative_edges(num_nodes, pos_keys, num_neg, seed=NEG_SEED):
+    """
+    num_neg distinct (i, j) pairs with i != j that are not positive edges,
+    drawn in batches and filtered against the sorted positive keys.
+    Returns (i, j) arrays.
+    """
+    available = num_nodes * (num_nodes - 1) - len(pos_keys)
+    if num_neg > available:
+        raise Exception(f"Cannot sample {num_neg} negative edges, only {available} non-edges exist")
+
+    rng = np.random.default_rng(seed=seed)
+    neg_keys = np.empty(0, dtype=np.int64)
+    while len(neg_keys) < num_neg:
+        batch = int((num_neg - len(neg_keys)) * NEG_BATCH_FACTOR) + 16
+        i = rng.integers(0, num_nodes, size=batch)
+        j = rng.integers(0, num_nodes, size=batch)
+        keys = (i * num_nodes + j)[i != j]
+
+        # drop positive edges (pos_keys is sorted)
+        pos = np.searchsorted(pos_keys, keys)
+        is_pos = pos < len(pos_keys)
+        is_pos[is_pos] = pos_keys[pos[is_pos]] == keys[is_pos]
+        keys = keys[~is_pos]
+
+        # drop repeats within the batch (keeping draw order) and earlier picks
+        _, first = np.unique(keys, return_index=True)
+        keys = keys[np.sort(first)]
+        keys = keys[~np.isin(keys, neg_keys)]
+        neg_keys = np.concatenate([neg_keys, keys[:num_neg - len(neg_keys)]])
+
+    return neg_keys // num_nodes, neg_keys % num_nodes
 
 # Load nodes and edges
-drugs = pd.read_csv("../data_processed/kg_drugs.csv")
-interactions = pd.read_csv("../data_processed/kg_interactions.csv")
+drugs = read_table("kg_drugs", columns=["drug_id", "drug_class", "type"])
+interactions = read_table("kg_interactions", columns=["drug1_id", "drug2_id"])
+end_stage("load tables")
 
 # Map each drug_id to a numeric index
 drug_ids = drugs["drug_id"].unique()
@@ -19,32 +73,17 @@ print("Number of nodes:", num_nodes)
 # ====== NODE FEATURES ======
 # drug_class -> categorical feature
 class_encoder = LabelEncoder()
-classes = drugs["drug_class"].fillna("UNKNOWN").astype(str)
+classes = drugs["drug_class"].astype(object).fillna("UNKNOWN").astype(str)
 class_enc = class_encoder.fit_transform(classes)  # [num_nodes]
 
 # type -> categorical feature
 type_encoder = LabelEncoder()
-types = drugs["type"].fillna("UNKNOWN").astype(str)
+types = drugs["type"].astype(object).fillna("UNKNOWN").astype(str)
 type_enc = type_encoder.fit_transform(types)      # [num_nodes]
 
-# Build positive edges (interactions)
-pos_edges = []
-for _, row in interactions.iterrows():
-    d1 = row["drug1_id"]
-    d2 = row["drug2_id"]
-    if d1 in drug_id_to_idx and d2 in drug_id_to_idx:
-        i = drug_id_to_idx[d1]
-        j = drug_id_to_idx[d2]
-        pos_edges.append((i, j))
-
-pos_edges = list(set(pos_edges))  # unique
-print("Positive edges:", len(pos_edges))
-
-# Degree feature (how connected each drug is)
-degrees = np.zeros(num_nodes, dtype=np.float32)
-for i, j in pos_edges:
-    degrees[i] += 1
-    degrees[j] += 1
+# Degree feature (how connected each drug is): distinct edges per drug,
+# precomputed in graph_stats.py
+degrees = GraphStats(load_graph_stats()).column("distinct_degree", drug_ids).astype(np.float32)
 
 # Normalize degree (0–1)
 if degrees.max() > 0:
@@ -54,30 +93,26 @@ if degrees.max() > 0:
 # We convert categorical encodings to float so GCN can process
 features = np.stack([class_enc, type_enc, degrees], axis=1).astype(np.float32)
 x = torch.tensor(features, dtype=torch.float)  # shape [num_nodes, 3]
+end_stage("node features")
 
-# Convert pos_edges to tensor
-edge_index_pos = torch.tensor(pos_edges, dtype=torch.long).t().contiguous()
+# Build positive edges (interactions between known drugs), unique
+node_index = pd.Index(drug_ids)
+src = node_index.get_indexer(interactions["drug1_id"].astype(object))
+dst = node_index.get_indexer(interactions["drug2_id"].astype(object))
+known = (src >= 0) & (dst >= 0)
+pos_keys = np.unique(src[known].astype(np.int64) * num_nodes + dst[known])  # sorted
+pos_i, pos_j = pos_keys // num_nodes, pos_keys % num_nodes
+print("Positive edges:", len(pos_keys))
+
+edge_index_pos = torch.from_numpy(np.stack([pos_i, pos_j])).long().contiguous()
+end_stage("positive edges")
 
 # ====== NEGATIVE EDGES ======
-pos_set = set(pos_edges)
-num_neg = len(pos_edges)
-neg_edges = set()
-
-rng = np.random.default_rng(seed=42)
-while len(neg_edges) < num_neg:
-    i = int(rng.integers(0, num_nodes))
-    j = int(rng.integers(0, num_nodes))
-    if i == j:
-        continue
-    e = (i, j)
-    if e in pos_set or e in neg_edges:
-        continue
-    neg_edges.add(e)
-
-neg_edges = list(neg_edges)
-print("Negative edges:", len(neg_edges))
-
-edge_index_neg = torch.tensor(neg_edges, dtype=torch.long).t().contiguous()
+neg_i, neg_j = sample_negative_edges(num_nodes, pos_keys, num_neg=len(pos_keys))
+print("Negative edges:", len(neg_i))
+
+edge_index_neg = torch.from_numpy(np.stack([neg_i, neg_j])).long().contiguous()
+end_stage("negative sampling")
 
 # Labels: 1 for positive, 0 for negative
 y_pos = torch.ones(edge_index_pos.size(1), dtype=torch.long)
@@ -100,5 +135,11 @@ torch.save({
 joblib.dump(drug_id_to_idx, "../data_processed/drug_id_to_idx.joblib")
 joblib.dump(class_encoder, "../data_processed/gnn_class_encoder.joblib")
 joblib.dump(type_encoder, "../data_processed/gnn_type_encoder.joblib")
+end_stage("save")
 
 print("Saved improved GNN dataset to ../data_processed/gnn_data.pt")
+
+print("\nStage timings:")
+for name, seconds in stage_seconds.items():
+    print(f"  {name:<20} {seconds:8.3f}s")
+print(f"  {'total':<20} {sum(stage_seconds.values()):8.3f}s")
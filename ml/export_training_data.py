@@ -1,5 +1,5 @@
 from py2neo import Graph
-import pandas as pd
+from table_store import write_table
 
 # 1) CONNECT TO NEO4J
 NEO4J_URI = "neo4j://127.0.0.1:7687"
@@ -25,9 +25,9 @@ def export_training_data():
     # 3) DROP ROWS WITH MISSING KEY FIELDS
     data = data.dropna(subset=["drug1_id", "drug2_id", "severity"])
 
-    # 4) SAVE TO CSV FOR ML
-    data.to_csv("../data_processed/training_data.csv", index=False)
-    print("Saved training data to ../data_processed/training_data.csv")
+    # 4) SAVE FOR ML
+    path = write_table(data, "training_data")
+    print(f"Saved training data to {path}")
 
 if __name__ == "__main__":
     export_training_data()
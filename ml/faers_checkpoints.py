@@ -0,0 +1,187 @@
+import os
+import json
+import hashlib
+import pandas as pd
+from table_store import DATA_DIR, read_table, table_path, write_table
+
+# Incremental FAERS aggregation.
+#
+# Every quarter's partial aggregate (drug report counts or pair counts) is
+# saved under ../data_processed/faers_checkpoints/, and a manifest records
+# which quarters - and which DRUG file hashes - are already folded into the
+# running totals (faers_drug_stats / faers_pairs). A run only computes
+# quarters that are new or whose DRUG file changed, then merges them into the
+# persisted totals (subtracting the old partial for a changed quarter).
+#
+# Checkpoints are keyed by the quarter directory's name (e.g. "Q2"), not its
+# full path, so moving or renaming the FAERS folder does not count a quarter
+# twice: a DRUG file whose hash is already recorded under another key takes
+# over that entry instead of being added again.
+
+CHECKPOINT_DIR = "faers_checkpoints"  # relative to table_store.DATA_DIR
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def quarter_key(quarter_dir):
+    """Checkpoint key of a quarter directory: its name, e.g. 'Q2'."""
+    return os.path.basename(os.path.normpath(os.path.realpath(quarter_dir)))
+
+
+class IncrementalAggregate:
+    """
+    Running totals of one FAERS aggregate, kept up to date quarter by quarter.
+
+    kind          - checkpoint prefix, e.g. "drug_counts"
+    output_table  - table_store name of the totals, e.g. "faers_drug_stats"
+    key_columns   - columns identifying a row, e.g. ["drug_name"]
+    count_column  - column that is summed, e.g. "faers_reports"
+    """
+
+    def __init__(self, kind, output_table, key_columns, count_column):
+        self.kind = kind
+        self.output_table = output_table
+        self.key_columns = key_columns
+        self.count_column = count_column
+        self.manifest_path = os.path.join(DATA_DIR, CHECKPOINT_DIR, f"{kind}_manifest.json")
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+
+    def _partial_table(self, key):
+        return f"{CHECKPOINT_DIR}/{self.kind}_{key}"
+
+    def _drop_partial(self, key):
+        for fmt in ("parquet", "csv"):
+            path = table_path(self._partial_table(key), fmt)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {"quarters": {}, "totals": None}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest):
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def _signature(self, totals):
+        return {"rows": int(len(totals)), "count_sum": int(totals[self.count_column].sum())}
+
+    def _merge(self, frames, signs):
+        parts = []
+        for frame, sign in zip(frames, signs):
+            frame = frame[self.key_columns + [self.count_column]].copy()
+            for col in self.key_columns:
+                frame[col] = frame[col].astype(object)
+            frame[self.count_column] = frame[self.count_column].astype("int64") * sign
+            parts.append(frame)
+        if not parts:
+            return pd.DataFrame(columns=self.key_columns + [self.count_column])
+        totals = (
+            pd.concat(parts, ignore_index=True)
+            .groupby(self.key_columns, as_index=False, sort=False)[self.count_column]
+            .sum()
+        )
+        totals = totals[totals[self.count_column] > 0]
+        return totals.sort_values(self.count_column, ascending=False)
+
+    def _load_totals(self, manifest):
+        """Persisted totals, or a rebuild from the partials if they look stale."""
+        quarters = manifest["quarters"]
+        if not quarters:
+            return self._merge([], [])
+        try:
+            totals = read_table(self.output_table)
+            if manifest.get("totals") == self._signature(totals):
+                return totals
+        except FileNotFoundError:
+            pass
+        print(f"Rebuilding {self.output_table} totals from {len(quarters)} quarter checkpoints")
+        partials = [read_table(self._partial_table(k)) for k in quarters]
+        return self._merge(partials, [1] * len(partials))
+
+    def update(self, quarter_dirs, drug_file_for, compute_partial, rebuild=False):
+        """
+        Fold the given quarters into the running totals and return them.
+
+        drug_file_for(quarter_dir)   -> path of the quarter's DRUG file
+        compute_partial(quarter_dir) -> DataFrame of the quarter's aggregate
+        Quarters already included with the same DRUG file hash are skipped;
+        quarters not listed stay in the totals.
+        """
+        manifest = {"quarters": {}, "totals": None} if rebuild else self._load_manifest()
+        quarters = manifest["quarters"]
+        totals = self._load_totals(manifest)
+
+        removed, added = [], []
+        keys = [quarter_key(q) for q in quarter_dirs]
+        if len(set(keys)) != len(keys):
+            raise Exception(f"Quarter directories must have distinct names: {list(quarter_dirs)}")
+        for quarter_dir, key in zip(quarter_dirs, keys):
+            drug_file = drug_file_for(quarter_dir)
+            stat = os.stat(drug_file)
+            entry = quarters.get(key)
+
+            if entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                print(f"{quarter_dir}: already included, skipping")
+                continue
+            sha256 = file_sha256(drug_file)
+            if entry is not None and entry["sha256"] == sha256:
+                entry.update(
+                    quarter_dir=os.path.realpath(quarter_dir), size=stat.st_size, mtime=stat.st_mtime
+                )
+                print(f"{quarter_dir}: already included (same hash), skipping")
+                continue
+
+            # the same DRUG file under another key (folder moved or renamed,
+            # or a manifest from before keys were quarter names): take it over
+            old_key = next((k for k, e in quarters.items() if k != key and e["sha256"] == sha256), None)
+            if old_key is not None:
+                print(f"{quarter_dir}: already included as {old_key}, moving its checkpoint")
+                if entry is not None:
+                    removed.append(read_table(self._partial_table(key)))
+                write_table(read_table(self._partial_table(old_key)), self._partial_table(key))
+                self._drop_partial(old_key)
+                quarters[key] = dict(
+                    quarters.pop(old_key),
+                    quarter_dir=os.path.realpath(quarter_dir),
+                    size=stat.st_size,
+                    mtime=stat.st_mtime,
+                )
+                continue
+
+            if entry is not None:
+                print(f"{quarter_dir}: DRUG file changed, replacing its checkpoint")
+                removed.append(read_table(self._partial_table(key)))
+
+            partial = compute_partial(quarter_dir)
+            write_table(partial, self._partial_table(key))
+            added.append(partial)
+            quarters[key] = {
+                "quarter_dir": os.path.realpath(quarter_dir),
+                "drug_file": os.path.basename(drug_file),
+                "sha256": sha256,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+            }
+
+        if removed or added or manifest.get("totals") != self._signature(totals):
+            totals = self._merge(
+                [totals] + removed + added,
+                [1] + [-1] * len(removed) + [1] * len(added),
+            )
+            write_table(totals, self.output_table)
+            manifest["totals"] = self._signature(totals)
+
+        self._save_manifest(manifest)
+        print(f"{self.output_table}: {len(quarters)} quarters included, {len(added)} (re)computed this run")
+        return totals
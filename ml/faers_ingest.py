@@ -0,0 +1,282 @@
+import os
+import glob
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Streaming ingestion of FAERS quarterly DRUG files.
+#
+# Each `$`-delimited DRUG file is read in chunks of CHUNK_ROWS rows with only
+# the needed columns, as strings. Partial drug counts and pair counts from
+# every chunk are folded into running aggregates, so peak memory depends on
+# the chunk size and the number of distinct drugs/pairs, not on how many
+# quarters are processed.
+
+BASE_PATH = "../data_faers"
+CHUNK_ROWS = 500_000
+
+PAIR_COLUMNS = ["drug_name_1", "drug_name_2", "pair_reports"]
+DRUG_NAME_KEYS = ["drugname", "medicinalproduct", "drugname_generic", "prod_ai"]
+
+
+def resolve_quarter_dirs(quarters):
+    """
+    Turn quarter names, paths or glob patterns into a sorted list of quarter
+    directories. Plain names like "Q2" are looked up under BASE_PATH, so the
+    old QUARTERS lists keep working; "../data_faers/20*" style globs pick up
+    the whole archive.
+    """
+    dirs = []
+    for q in quarters:
+        candidates = [q, os.path.join(BASE_PATH, q)]
+        matches = []
+        for pattern in candidates:
+            if glob.has_magic(pattern):
+                matches = sorted(glob.glob(pattern))
+            elif os.path.isdir(pattern):
+                matches = [pattern]
+            matches = [m for m in matches if os.path.isdir(m)]
+            if matches:
+                break
+        if not matches:
+            raise Exception(f"No FAERS quarter directory found for {q!r}")
+        dirs.extend(m for m in matches if m not in dirs)
+    return dirs
+
+
+def find_drug_file(quarter_dir):
+    """DRUG.txt, or the FDA's own naming (e.g. DRUG24Q2.txt), case-insensitive."""
+    names = sorted(os.listdir(quarter_dir))
+    for name in names:
+        if name.lower() == "drug.txt":
+            return os.path.join(quarter_dir, name)
+    for name in names:
+        lower = name.lower()
+        if lower.startswith("drug") and lower.endswith(".txt"):
+            return os.path.join(quarter_dir, name)
+    raise Exception(f"No DRUG file found in {quarter_dir}")
+
+
+def read_header(path):
+    """Empty DataFrame with the file's columns (no rows are read)."""
+    return pd.read_csv(path, sep="$", nrows=0)
+
+
+def iter_drug_chunks(path, columns, chunksize=CHUNK_ROWS):
+    """
+    Yield chunks of a DRUG file with only `columns` (original header names),
+    all read as strings so pandas never has to infer mixed types.
+    """
+    return pd.read_csv(
+        path,
+        sep="$",
+        usecols=columns,
+        dtype={c: str for c in columns},
+        chunksize=chunksize,
+    )
+
+
+def pair_counts_by_code(primary_ids, drug_names):
+    """
+    Count how many reports mention each unordered pair of drug names.
+
+    Drug names are normalized (strip + upper) and mapped to integer codes
+    once. A sparse report x drug incidence matrix A (1 if the report
+    mentions the drug) then gives all pair counts at once: (A.T @ A)[i, j] is
+    the number of reports containing both drug i and drug j.
+
+    Returns (names, i, j, counts) where names are the sorted distinct drug
+    names and i < j index into them.
+    """
+    df = pd.DataFrame({"report": primary_ids, "drug": drug_names}).dropna()
+    if df.empty:
+        empty = np.empty(0, dtype=np.int64)
+        return np.empty(0, dtype=object), empty, empty, empty
+
+    drugs = df["drug"].astype(str).str.strip().str.upper()
+    report_codes, _ = pd.factorize(df["report"])
+    drug_codes, names = pd.factorize(drugs, sort=True)
+
+    incidence = sparse.csr_matrix(
+        (np.ones(len(df), dtype=np.int32), (report_codes, drug_codes)),
+        shape=(report_codes.max() + 1, len(names)),
+    )
+    # the same drug listed twice in one report still counts once
+    incidence.sum_duplicates()
+    incidence.data[:] = 1
+
+    co_reports = sparse.triu(incidence.T @ incidence, k=1).tocoo()
+    return (
+        np.asarray(names, dtype=object),
+        co_reports.row.astype(np.int64),
+        co_reports.col.astype(np.int64),
+        co_reports.data.astype(np.int64),
+    )
+
+
+def count_report_pairs(primary_ids, drug_names):
+    """
+    Pair counts as a DataFrame. Codes follow sorted name order, so pairs come
+    out with drug_name_1 < drug_name_2, like combinations(sorted(drugs), 2).
+    """
+    names, i, j, counts = pair_counts_by_code(primary_ids, drug_names)
+    return pd.DataFrame({
+        "drug_name_1": names[i],
+        "drug_name_2": names[j],
+        "pair_reports": counts,
+    }, columns=PAIR_COLUMNS)
+
+
+class DrugCounter:
+    """Running count of DRUG rows per normalized drug name."""
+
+    def __init__(self):
+        self.counts = pd.Series(dtype=np.int64)
+
+    def add(self, drug_names):
+        # same normalization as str(value).strip().upper(): missing -> "NAN"
+        names = drug_names.fillna("nan").astype(str).str.strip().str.upper()
+        names = names[names != ""]
+        self.counts = self.counts.add(names.value_counts(), fill_value=0).astype(np.int64)
+
+    def to_frame(self):
+        df = pd.DataFrame({
+            "drug_name": self.counts.index.astype(object),
+            "faers_reports": self.counts.to_numpy(),
+        })
+        return df.sort_values("faers_reports", ascending=False)
+
+
+class PairCounter:
+    """
+    Running co-report counts keyed by integer drug codes.
+
+    Drug names get a global code the first time they are seen; each pair is
+    a single int64 key (code_a << 32 | code_b). Partial counts are buffered
+    and merged with np.unique/bincount every COMPACT_EVERY keys, so memory
+    stays proportional to the number of distinct pairs.
+    """
+
+    COMPACT_EVERY = 5_000_000
+
+    def __init__(self):
+        self.code_by_name = {}
+        self.names = []
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self._pending_keys = []
+        self._pending_counts = []
+        self._pending = 0
+
+    def _global_codes(self, names):
+        codes = np.empty(len(names), dtype=np.int64)
+        for k, name in enumerate(names):
+            code = self.code_by_name.get(name)
+            if code is None:
+                code = self.code_by_name[name] = len(self.names)
+                self.names.append(name)
+            codes[k] = code
+        return codes
+
+    def add_reports(self, primary_ids, drug_names):
+        names, i, j, counts = pair_counts_by_code(primary_ids, drug_names)
+        if len(counts) == 0:
+            return
+        codes = self._global_codes(names)
+        a, b = codes[i], codes[j]
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        self._pending_keys.append((lo << 32) | hi)
+        self._pending_counts.append(counts)
+        self._pending += len(counts)
+        if self._pending >= self.COMPACT_EVERY:
+            self._compact()
+
+    def _compact(self):
+        if not self._pending_keys:
+            return
+        keys = np.concatenate([self.keys] + self._pending_keys)
+        counts = np.concatenate([self.counts] + self._pending_counts)
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=counts).astype(np.int64)
+        self._pending_keys, self._pending_counts, self._pending = [], [], 0
+
+    def to_frame(self):
+        self._compact()
+        names = np.asarray(self.names, dtype=object)
+        name_a = names[self.keys >> 32]
+        name_b = names[self.keys & 0xFFFFFFFF]
+        # global codes are in first-seen order; put the names in sorted order
+        swap = name_a > name_b
+        name_1 = np.where(swap, name_b, name_a)
+        name_2 = np.where(swap, name_a, name_b)
+        df = pd.DataFrame({
+            "drug_name_1": name_1,
+            "drug_name_2": name_2,
+            "pair_reports": self.counts,
+        }, columns=PAIR_COLUMNS)
+        return df.sort_values("pair_reports", ascending=False)
+
+
+def get_drug_name_column(df):
+    """
+    Try to find the drug name column in a case-insensitive way.
+    Works for 'drugname', 'DRUGNAME', 'MEDICINALPRODUCT', etc.
+    """
+    # Map lowercase column names to original
+    cols_lower = {c.lower(): c for c in df.columns}
+
+    for key in DRUG_NAME_KEYS:
+        if key in cols_lower:
+            return cols_lower[key]
+
+    # If nothing matched, raise an error showing available columns
+    raise Exception(f"No known drug name column found. Available columns: {df.columns}")
+
+
+def _check_reports_ascending(ids, last_id, path):
+    """
+    Raise unless the reports in ids come in ascending PRIMARYID order, each
+    as one run of rows, after last_id (the last report of the previous
+    chunk). Returns the new last report id. Only that one id is kept between
+    chunks, so the check does not grow with the file.
+    """
+    ids = pd.Series(ids).dropna()  # rows without a PRIMARYID are never counted
+    if ids.empty:
+        return last_id
+    try:
+        ids = pd.to_numeric(ids, errors="raise").to_numpy()
+    except ValueError:
+        raise Exception(f"{path}: PRIMARYID values must be numeric")
+    runs = ids[np.r_[True, ids[1:] != ids[:-1]]]
+    if (runs[1:] <= runs[:-1]).any() or (last_id is not None and runs[0] <= last_id):
+        raise Exception(
+            f"{path}: rows are not sorted by PRIMARYID, so per-chunk pair "
+            "counts could be wrong; sort the DRUG file by PRIMARYID first"
+        )
+    return runs[-1]
+
+
+def iter_report_chunks(path, primary_col, drug_col, chunksize=CHUNK_ROWS):
+    """
+    Like iter_drug_chunks, but never splits one report across two chunks:
+    rows of the last PRIMARYID in a chunk are carried over to the next one.
+    FAERS DRUG files are sorted by PRIMARYID, which keeps all rows of a
+    report together and makes per-chunk pair counting exact; a file where
+    that does not hold raises instead of undercounting pairs.
+    """
+    carry = None
+    previous_id = None  # last report yielded so far
+    for chunk in iter_drug_chunks(path, [primary_col, drug_col], chunksize):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        last_id = chunk[primary_col].iloc[-1]
+        tail = (chunk[primary_col] == last_id).to_numpy()
+        # rows of the last report are contiguous at the end of the chunk
+        split = len(chunk) - np.argmin(tail[::-1]) if not tail.all() else 0
+        carry = chunk.iloc[split:]
+        if split:
+            previous_id = _check_reports_ascending(chunk[primary_col].iloc[:split], previous_id, path)
+            yield chunk.iloc[:split]
+    if carry is not None and len(carry):
+        _check_reports_ascending(carry[primary_col], previous_id, path)
+        yield carry
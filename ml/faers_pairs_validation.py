@@ -1,65 +1,26 @@
-import pandas as pd
-from risk_scoring import predict_pair_severity
+import os
+from table_store import read_table
+from validation_engine import report_timing, validate_faers_pairs
 
-# Load FAERS pair data + DrugBank metadata
-faers_pairs = pd.read_csv("../data_processed/faers_pairs.csv")
-drugs = pd.read_csv("../data_processed/drugs.csv")
-
-# Normalize names for matching
-drugs["name_upper"] = drugs["name"].str.upper().str.strip()
-
-name_to_id = dict(zip(drugs["name_upper"], drugs["drug_id"]))
-
-def map_name_to_id(name):
-    return name_to_id.get(str(name).upper().strip())
-
-def is_high_risk(severity_label: str) -> bool:
-    s = str(severity_label).lower()
-    return ("severe" in s) or ("major" in s) or ("contraindicat" in s) or ("moderate" in s)
+# Load FAERS pair data (names are mapped to DrugBank by name_resolver.py)
+faers_pairs = read_table("faers_pairs")
 
 def main():
     # Restrict to strong FAERS pairs (you can adjust this min_reports upwards)
-    MIN_REPORTS = 20  # try 20, 50, 100 etc. Higher = stronger signal
-
-    strong_pairs = faers_pairs[faers_pairs["pair_reports"] >= MIN_REPORTS].copy()
-    print(f"Total FAERS pairs with >= {MIN_REPORTS} reports: {len(strong_pairs)}")
-
-    total_evaluated = 0
-    correctly_flagged = 0
+    MIN_REPORTS = int(os.environ.get("DDI_FAERS_MIN_REPORTS", 20))  # try 20, 50, 100 etc. Higher = stronger signal
 
-    details = []
+    # Pairs whose names don't resolve to DrugBank are skipped
+    n_strong, details, metrics = validate_faers_pairs(faers_pairs, MIN_REPORTS)
+    print(f"Total FAERS pairs with >= {MIN_REPORTS} reports: {n_strong}")
 
-    for _, row in strong_pairs.iterrows():
-        n1 = row["drug_name_1"]
-        n2 = row["drug_name_2"]
-        count = row["pair_reports"]
-
-        id1 = map_name_to_id(n1)
-        id2 = map_name_to_id(n2)
-
-        if not id1 or not id2:
-            continue  # skip if we can't map to DrugBank
-
-        severity_label, _ = predict_pair_severity(id1, id2)
-        high_risk = is_high_risk(severity_label)
-
-        total_evaluated += 1
-        if high_risk:
-            correctly_flagged += 1
-
-        details.append({
-            "drug_name_1": n1,
-            "drug_name_2": n2,
-            "pair_reports": count,
-            "severity_pred": severity_label,
-            "model_flags_high": high_risk
-        })
+    total_evaluated = metrics["total"]
+    correctly_flagged = metrics["flagged"]
 
     if total_evaluated == 0:
         print("No pairs evaluated. Check name matching or MIN_REPORTS.")
         return
 
-    precision = correctly_flagged / total_evaluated * 100
+    precision = metrics["precision"]
 
     print("==== FAERS Pair-Level Validation ====")
     print(f"MIN_REPORTS threshold: {MIN_REPORTS}")
@@ -67,7 +28,9 @@ def main():
     print(f"Pairs flagged high-risk by model: {correctly_flagged}")
     print(f"Agreement (precision on high-FAERS pairs): {precision:.2f}%")
 
-    pd.DataFrame(details).to_csv("../data_processed/faers_pairs_validation_results.csv", index=False)
+    report_timing("Validation", total_evaluated, metrics["seconds"])
+
+    details.to_csv("../data_processed/faers_pairs_validation_results.csv", index=False)
     print("Saved detailed results to ../data_processed/faers_pairs_validation_results.csv")
 
 if __name__ == "__main__":
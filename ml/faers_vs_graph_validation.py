@@ -1,37 +1,24 @@
 import pandas as pd
+from table_store import read_table
+from graph_stats import load_graph_stats
+from name_resolver import resolve_names
 
 # 1) LOAD DATA
-faers = pd.read_csv("../data_processed/faers_drug_stats.csv")
-drugs = pd.read_csv("../data_processed/drugs.csv")
-kg = pd.read_csv("../data_processed/kg_interactions.csv")  # change name if your file is different
+faers = read_table("faers_drug_stats")
 
-# 2) BUILD INTERACTION DEGREE PER DRUG
-degree_counts = {}
+# 2) INTERACTION DEGREE PER DRUG (precomputed, see graph_stats.py)
+graph_stats = load_graph_stats()
+degree_df = graph_stats.loc[
+    graph_stats["interaction_degree"] > 0, ["drug_id", "interaction_degree"]
+]
 
-for _, row in kg.iterrows():
-    d1 = row["drug1_id"]
-    d2 = row["drug2_id"]
+# 3) RESOLVE FAERS NAMES TO DRUGBANK IDS (exact, aliases, fuzzy; see name_resolver.py)
+resolved = resolve_names(faers["drug_name"])
+faers["drug_id"] = resolved["drug_id"].to_numpy()
+faers["name_match"] = resolved["match"].to_numpy()
 
-    degree_counts[d1] = degree_counts.get(d1, 0) + 1
-    degree_counts[d2] = degree_counts.get(d2, 0) + 1
-
-degree_df = pd.DataFrame([
-    {"drug_id": drug_id, "interaction_degree": deg}
-    for drug_id, deg in degree_counts.items()
-])
-
-# 3) NORMALIZE NAMES FOR MATCHING
-faers["drug_name_upper"] = faers["drug_name"].str.upper().str.strip()
-drugs["name_upper"] = drugs["name"].str.upper().str.strip()
-
-# 4) MERGE FAERS ↔ DRUGBANK NAMES
-merged = pd.merge(
-    faers,
-    drugs[["drug_id", "name_upper"]],
-    left_on="drug_name_upper",
-    right_on="name_upper",
-    how="inner"
-)
+# 4) KEEP FAERS NAMES THAT RESOLVED
+merged = faers.dropna(subset=["drug_id"])
 
 # 5) MERGE INTERACTION DEGREE
 merged = pd.merge(
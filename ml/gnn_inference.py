@@ -0,0 +1,136 @@
+import os
+import numpy as np
+import joblib
+from table_store import DATA_DIR
+from pair_cache import artifact_version
+
+# NumPy-only pair scoring with the trained GCN link predictor.
+#
+# After GCNLinkPredictor.encode has run once, scoring a pair is just
+#   logits = lin([z_i, z_j]) = z_i @ W1.T + z_j @ W2.T + b
+# so train_gnn.py exports the node embeddings z (a .npy file that can be
+# memory-mapped, float32 or float16) and the decoder weights, and this module
+# scores pairs without importing torch or torch_geometric. Rows of z follow
+# drug_id_to_idx.joblib from build_gnn_dataset.py.
+#
+# Select it behind compute_regimen_risk with DDI_PAIR_SCORER=gnn. The
+# interaction probability is mapped to a severity label with the thresholds
+# below, using only the severity encoder's labels ("severe", "moderate",
+# "unknown"), so regimen risk scores are counted the same way as with the RF.
+
+GNN_EMBEDDINGS_FILE = os.path.join(DATA_DIR, "gnn_embeddings.npy")
+GNN_DECODER_FILE = os.path.join(DATA_DIR, "gnn_decoder.npz")
+DRUG_ID_TO_IDX_FILE = os.path.join(DATA_DIR, "drug_id_to_idx.joblib")
+
+EXPORT_DTYPE = os.environ.get("DDI_GNN_EXPORT_DTYPE", "float32")  # or float16
+SEVERE_THRESHOLD = float(os.environ.get("DDI_GNN_SEVERE_THRESHOLD", 0.8))
+MODERATE_THRESHOLD = float(os.environ.get("DDI_GNN_MODERATE_THRESHOLD", 0.5))
+
+PROJECTION_BLOCK_ROWS = 65536  # embedding rows projected per step at load time
+
+
+def export_gnn_artifacts(z, weight, bias, dtype=EXPORT_DTYPE):
+    """
+    Save node embeddings z [N, H] and the decoder's linear layer
+    (weight [2, 2H], bias [2]) as NumPy arrays. Returns the paths written.
+    """
+    np.save(GNN_EMBEDDINGS_FILE, np.ascontiguousarray(z, dtype=dtype))
+    np.savez(
+        GNN_DECODER_FILE,
+        weight=np.asarray(weight, dtype=np.float32),
+        bias=np.asarray(bias, dtype=np.float32),
+    )
+    return GNN_EMBEDDINGS_FILE, GNN_DECODER_FILE
+
+
+def severity_labels_for(probabilities, severe=SEVERE_THRESHOLD, moderate=MODERATE_THRESHOLD):
+    """Below the moderate threshold (or NaN) is "unknown", like the RF's lowest class."""
+    labels = np.full(len(probabilities), "unknown", dtype=object)
+    labels[probabilities >= moderate] = "moderate"
+    labels[probabilities >= severe] = "severe"
+    return labels
+
+
+class GNNPairScorer:
+    """
+    Scores (drug1_id, drug2_id) pairs from exported GNN artifacts.
+
+    The decoder is linear, so each node's contribution is projected once at
+    load time: left[i] = z_i @ W1.T and right[j] = z_j @ W2.T. Scoring a
+    batch is then two gathers and an add.
+    """
+
+    def __init__(self, embeddings, weight, bias, drug_id_to_idx, version=None,
+                 severe=SEVERE_THRESHOLD, moderate=MODERATE_THRESHOLD):
+        hidden = embeddings.shape[1]
+        w_left = weight[:, :hidden].T.astype(np.float32)
+        w_right = weight[:, hidden:].T.astype(np.float32)
+
+        n = embeddings.shape[0]
+        self.left = np.empty((n, weight.shape[0]), dtype=np.float32)
+        self.right = np.empty((n, weight.shape[0]), dtype=np.float32)
+        for start in range(0, n, PROJECTION_BLOCK_ROWS):
+            block = np.asarray(embeddings[start:start + PROJECTION_BLOCK_ROWS], dtype=np.float32)
+            self.left[start:start + len(block)] = block @ w_left
+            self.right[start:start + len(block)] = block @ w_right
+
+        self.embeddings = embeddings
+        self.bias = bias.astype(np.float32)
+        self.drug_id_to_idx = drug_id_to_idx
+        self.severe = severe
+        self.moderate = moderate
+        self.version = version
+
+    def node_indexes(self, drug_ids):
+        """Embedding rows for drug_ids; -1 for drugs the GNN has not seen."""
+        return np.fromiter(
+            (self.drug_id_to_idx.get(d, -1) for d in drug_ids), dtype=np.int64, count=len(drug_ids)
+        )
+
+    def logits(self, i, j):
+        return self.left[i] + self.right[j] + self.bias
+
+    def predict_proba(self, pairs):
+        """[n, 2] softmax of the decoder logits (no interaction, interaction)."""
+        i = self.node_indexes([d1 for d1, _ in pairs])
+        j = self.node_indexes([d2 for _, d2 in pairs])
+        known = (i >= 0) & (j >= 0)
+
+        probs = np.full((len(pairs), 2), np.nan, dtype=np.float32)
+        logits = self.logits(i[known], j[known])
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        probs[known] = exp / exp.sum(axis=1, keepdims=True)
+        return probs
+
+    def score_pairs(self, pairs):
+        """
+        Same contract as the RandomForest scorer: (severity_labels, probs).
+        Pairs with a drug outside the GNN graph get "unknown" and NaN probs.
+        """
+        probs = self.predict_proba(pairs)
+        return list(severity_labels_for(probs[:, 1], self.severe, self.moderate)), probs
+
+
+def gnn_artifact_version():
+    """Version tag of the exported GNN files and thresholds (see pair_cache.artifact_version)."""
+    version = artifact_version([GNN_EMBEDDINGS_FILE, GNN_DECODER_FILE, DRUG_ID_TO_IDX_FILE])
+    return version + (("thresholds", SEVERE_THRESHOLD, MODERATE_THRESHOLD),)
+
+
+def load_gnn_scorer():
+    version = gnn_artifact_version()
+    for path in (GNN_EMBEDDINGS_FILE, GNN_DECODER_FILE, DRUG_ID_TO_IDX_FILE):
+        if not os.path.exists(path):
+            raise Exception(f"{path} not found; run build_gnn_dataset.py and train_gnn.py first")
+
+    embeddings = np.load(GNN_EMBEDDINGS_FILE, mmap_mode="r")
+    decoder = np.load(GNN_DECODER_FILE)
+    drug_id_to_idx = joblib.load(DRUG_ID_TO_IDX_FILE)
+    if len(drug_id_to_idx) != embeddings.shape[0]:
+        raise Exception(
+            f"{GNN_EMBEDDINGS_FILE} has {embeddings.shape[0]} rows but "
+            f"{DRUG_ID_TO_IDX_FILE} maps {len(drug_id_to_idx)} drugs"
+        )
+
+    return GNNPairScorer(embeddings, decoder["weight"], decoder["bias"], drug_id_to_idx, version)
@@ -0,0 +1,160 @@
+import os
+import numpy as np
+import torch
+from torch_geometric.nn.conv.gcn_conv import gcn_norm
+
+# Neighbour sampling for mini-batch link-prediction training (train_gnn.py).
+#
+# For a batch of target edges, the GNN only needs the nodes within
+# len(fan_out) hops of the batch's endpoints. LinkNeighborSampler samples at
+# most fan_out[k] incoming edges per node at hop k and returns that small
+# subgraph relabelled to local node ids, so memory per step depends on batch
+# size and fan-out instead of the whole graph. It is plain NumPy over a CSR
+# index (no pyg-lib / torch-sparse needed) and runs inside DataLoader workers.
+#
+# LayerwisePropagator is the inference side: exact full-neighbour GCN layers
+# computed for block_nodes destination nodes at a time, so evaluating and
+# exporting embeddings never builds the whole graph's [E, hidden] messages.
+
+
+class LinkBatch:
+    """Sampled computation graph of one batch of target edges."""
+
+    def __init__(self, nodes, edge_index, pair_index, y):
+        self.nodes = nodes            # [n] global node ids; local id = position
+        self.edge_index = edge_index  # [2, E] message edges, local ids
+        self.pair_index = pair_index  # [2, B] target edges, local ids
+        self.y = y                    # [B] labels
+
+    def to(self, device):
+        return LinkBatch(*(t.to(device) for t in (self.nodes, self.edge_index, self.pair_index, self.y)))
+
+
+class LinkNeighborSampler:
+    def __init__(self, edge_index, num_nodes, fan_out, pairs, labels):
+        # GCNConv passes messages src -> dst, so a node's inputs are its
+        # in-edges: group the edges by destination
+        src, dst = edge_index.cpu().numpy()
+        order = np.argsort(dst, kind="stable")
+        self.sources = src[order].astype(np.int64)
+        self.indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=num_nodes), out=self.indptr[1:])
+
+        self.num_nodes = num_nodes
+        self.fan_out = list(fan_out)
+        self.pairs = pairs.cpu().numpy()
+        self.labels = labels.cpu()
+        self._rng = None
+        self._rng_pid = None
+
+    def _get_rng(self):
+        # one generator per (DataLoader worker) process, seeded by torch
+        if self._rng is None or self._rng_pid != os.getpid():
+            self._rng = np.random.default_rng(torch.initial_seed() % 2**32)
+            self._rng_pid = os.getpid()
+        return self._rng
+
+    def sample_in_edges(self, nodes, k, rng):
+        """
+        Up to k in-edges per node as (src, dst) arrays. Nodes with at most k
+        in-edges keep all of them; for the others k draws with replacement
+        are made and repeats dropped, which keeps the sampling vectorized.
+        """
+        starts = self.indptr[nodes]
+        counts = self.indptr[nodes + 1] - starts
+
+        small = counts <= k
+        c_small = counts[small]
+        # every in-edge of the small nodes: start + 0 .. count - 1
+        within = np.arange(c_small.sum()) - np.repeat(np.cumsum(c_small) - c_small, c_small)
+        offsets_small = np.repeat(starts[small], c_small) + within
+        dst_small = np.repeat(nodes[small], c_small)
+
+        big = ~small
+        draws = (rng.random((big.sum(), k)) * counts[big][:, None]).astype(np.int64)
+        offsets_big = (starts[big][:, None] + draws).ravel()
+        dst_big = np.repeat(nodes[big], k)
+
+        src = self.sources[np.concatenate([offsets_small, offsets_big])]
+        dst = np.concatenate([dst_small, dst_big])
+        keys = np.unique(src * self.num_nodes + dst)
+        return keys // self.num_nodes, keys % self.num_nodes
+
+    def sample(self, batch_ids):
+        rng = self._get_rng()
+        pairs = self.pairs[:, batch_ids]
+
+        nodes = np.unique(pairs)
+        frontier = nodes
+        edge_src, edge_dst = [], []
+        for k in self.fan_out:
+            if len(frontier) == 0:
+                break
+            src, dst = self.sample_in_edges(frontier, k, rng)
+            edge_src.append(src)
+            edge_dst.append(dst)
+            frontier = np.setdiff1d(np.unique(src), nodes, assume_unique=True)
+            nodes = np.concatenate([nodes, frontier])
+
+        src = np.concatenate(edge_src) if edge_src else np.empty(0, dtype=np.int64)
+        dst = np.concatenate(edge_dst) if edge_dst else np.empty(0, dtype=np.int64)
+
+        # global -> local ids (position in nodes)
+        sorter = np.argsort(nodes)
+        def to_local(ids):
+            return sorter[np.searchsorted(nodes, ids, sorter=sorter)]
+
+        return LinkBatch(
+            torch.from_numpy(nodes),
+            torch.from_numpy(np.stack([to_local(src), to_local(dst)])),
+            torch.from_numpy(np.stack([to_local(pairs[0]), to_local(pairs[1])])),
+            self.labels[torch.as_tensor(batch_ids)],
+        )
+
+    def _collate(self, ids):
+        return self.sample(np.asarray(ids))
+
+    def loader(self, batch_size, num_workers=0, shuffle=True):
+        """DataLoader yielding a LinkBatch per batch_size target edges."""
+        return torch.utils.data.DataLoader(
+            range(self.pairs.shape[1]),
+            batch_size=batch_size,
+            shuffle=shuffle,
+            num_workers=num_workers,
+            collate_fn=self._collate,
+            persistent_workers=num_workers > 0,
+        )
+
+
+class LayerwisePropagator:
+    """
+    Full-neighbour GCNConv passes in blocks of destination nodes. Uses the
+    same symmetric normalization (with self loops) as GCNConv over the whole
+    graph, so the output matches conv(x, edge_index); only one block's
+    messages are held at a time.
+    """
+
+    def __init__(self, edge_index, num_nodes, block_nodes):
+        edge_index, weight = gcn_norm(edge_index, None, num_nodes, add_self_loops=True)
+        order = torch.argsort(edge_index[1], stable=True)
+        self.src = edge_index[0, order]
+        self.dst = edge_index[1, order]
+        self.weight = weight[order]
+        self.indptr = torch.zeros(num_nodes + 1, dtype=torch.long, device=edge_index.device)
+        torch.cumsum(torch.bincount(self.dst, minlength=num_nodes), 0, out=self.indptr[1:])
+        self.num_nodes = num_nodes
+        self.block_nodes = block_nodes
+
+    @torch.no_grad()
+    def conv(self, conv, h):
+        """conv(h, edge_index) for a GCNConv layer, block_nodes rows at a time."""
+        xw = torch.cat([conv.lin(h[i:i + self.block_nodes]) for i in range(0, self.num_nodes, self.block_nodes)])
+        out = torch.zeros_like(xw)
+        for start in range(0, self.num_nodes, self.block_nodes):
+            end = min(start + self.block_nodes, self.num_nodes)
+            e0, e1 = self.indptr[start].item(), self.indptr[end].item()
+            messages = xw[self.src[e0:e1]] * self.weight[e0:e1, None]
+            out[start:end].index_add_(0, self.dst[e0:e1] - start, messages)
+        if conv.bias is not None:
+            out += conv.bias
+        return out
@@ -0,0 +1,196 @@
+import os
+import time
+import multiprocessing
+import numpy as np
+import app_state
+from gnn_inference import GNN_DECODER_FILE, GNN_EMBEDDINGS_FILE, load_gnn_scorer
+from table_store import DATA_DIR
+
+# Offline top-k partner index from the GNN link predictor.
+#
+# For every drug, the TOPK partners with the highest and the lowest predicted
+# interaction probability are stored in gnn_topk.npz, so "what does X most
+# likely interact with?" and "what is safest next to X?" are an O(k) slice at
+# request time instead of scoring N candidates.
+#
+# The decoder is a linear layer over [z_i, z_j], so the interaction margin
+# (logit1 - logit0) of a pair splits into per-node terms:
+#   margin(i, j) = a[i] + c[j] + beta
+# A pair's risk is the worse of its two orientations (regimens are unordered),
+# so a block of rows of the N x N score matrix is
+#   max(a[I, None] + c[None, :], a[None, :] + c[I, None])
+# i.e. two broadcast adds of length-N vectors per row, no embedding matmuls.
+# Rows are processed BLOCK_ROWS at a time in a fork pool of WORKERS
+# processes, so memory stays at about WORKERS * BLOCK_ROWS * N floats.
+#
+# python gnn_topk.py rebuilds the index after train_gnn.py; the API only reads it.
+
+GNN_TOPK_FILE = os.path.join(DATA_DIR, "gnn_topk.npz")
+TOPK = int(os.environ.get("DDI_GNN_TOPK", 20))
+BLOCK_ROWS = int(os.environ.get("DDI_GNN_TOPK_BLOCK_ROWS", 1024))
+WORKERS = int(os.environ.get("DDI_GNN_TOPK_WORKERS", os.cpu_count() or 1))
+
+# set in the parent before forking, shared copy-on-write with the workers
+_margins = {}
+
+
+def sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _top_columns(scores, k):
+    """Column indexes of the k largest scores per row, largest first."""
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1)
+
+
+def score_block(start):
+    """(start, high_idx, high_margin, low_idx, low_margin) for one block of rows."""
+    a, c, k = _margins["a"], _margins["c"], _margins["k"]
+    rows = np.arange(start, min(start + BLOCK_ROWS, len(a)))
+    scores = np.maximum(a[rows, None] + c[None, :], a[None, :] + c[rows, None])
+    local = np.arange(len(rows))
+
+    scores[local, rows] = -np.inf  # a drug is not its own partner
+    high = _top_columns(scores, k)
+    high_margin = np.take_along_axis(scores, high, axis=1)
+
+    scores[local, rows] = np.inf
+    np.negative(scores, out=scores)
+    low = _top_columns(scores, k)
+    low_margin = -np.take_along_axis(scores, low, axis=1)
+    return start, high, high_margin, low, low_margin
+
+
+def compute_topk(left, right, bias, k=TOPK, workers=WORKERS):
+    """
+    left/right: per-node decoder projections [N, 2] (GNNPairScorer.left /
+    .right), bias: [2]. Returns (high_idx, high_prob, low_idx, low_prob),
+    each [N, k], ordered from the highest / lowest probability.
+    """
+    n = len(left)
+    k = min(k, n - 1)
+    if k <= 0:
+        # fewer than two drugs (or k=0): no partners to rank
+        empty_idx = np.empty((n, 0), dtype=np.int32)
+        empty_prob = np.empty((n, 0), dtype=np.float32)
+        return empty_idx, empty_prob, empty_idx.copy(), empty_prob.copy()
+
+    _margins["a"] = (left[:, 1] - left[:, 0]).astype(np.float32)
+    _margins["c"] = (right[:, 1] - right[:, 0]).astype(np.float32)
+    _margins["k"] = k
+    beta = np.float32(bias[1] - bias[0])
+
+    high_idx = np.empty((n, k), dtype=np.int32)
+    low_idx = np.empty((n, k), dtype=np.int32)
+    high_margin = np.empty((n, k), dtype=np.float32)
+    low_margin = np.empty((n, k), dtype=np.float32)
+
+    starts = range(0, n, BLOCK_ROWS)
+    if workers > 1 and len(starts) > 1:
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            blocks = list(pool.imap_unordered(score_block, starts))
+    else:
+        blocks = map(score_block, starts)
+    for start, hi, hi_m, lo, lo_m in blocks:
+        end = start + len(hi)
+        high_idx[start:end], high_margin[start:end] = hi, hi_m
+        low_idx[start:end], low_margin[start:end] = lo, lo_m
+    _margins.clear()
+
+    return high_idx, sigmoid(high_margin + beta), low_idx, sigmoid(low_margin + beta)
+
+
+def build_gnn_topk(k=TOPK, workers=WORKERS):
+    start = time.perf_counter()
+    scorer = load_gnn_scorer()
+    drug_ids = np.empty(len(scorer.drug_id_to_idx), dtype=object)
+    for drug_id, i in scorer.drug_id_to_idx.items():
+        drug_ids[i] = drug_id
+
+    high_idx, high_prob, low_idx, low_prob = compute_topk(
+        scorer.left, scorer.right, scorer.bias, k, workers
+    )
+    np.savez(
+        GNN_TOPK_FILE,
+        drug_ids=drug_ids.astype(str),
+        high_idx=high_idx,
+        high_prob=high_prob.astype(np.float16),
+        low_idx=low_idx,
+        low_prob=low_prob.astype(np.float16),
+    )
+    n = len(drug_ids)
+    seconds = time.perf_counter() - start
+    print(f"Scored {n * (n - 1) // 2} drug pairs in {seconds:.2f}s "
+          f"({workers} workers, {BLOCK_ROWS} rows per block)")
+    return GNN_TOPK_FILE
+
+
+def gnn_topk_is_current():
+    if not os.path.exists(GNN_TOPK_FILE):
+        return False
+    built = os.path.getmtime(GNN_TOPK_FILE)
+    return all(
+        not os.path.exists(p) or os.path.getmtime(p) <= built
+        for p in (GNN_EMBEDDINGS_FILE, GNN_DECODER_FILE)
+    )
+
+
+class GNNTopKIndex:
+    """Per-drug lookup over gnn_topk.npz."""
+
+    def __init__(self, path=GNN_TOPK_FILE):
+        with np.load(path) as f:
+            self.drug_ids = f["drug_ids"].astype(object)
+            self.high_idx, self.high_prob = f["high_idx"], f["high_prob"]
+            self.low_idx, self.low_prob = f["low_idx"], f["low_prob"]
+        self.row_by_id = {d: i for i, d in enumerate(self.drug_ids)}
+        self.k = self.high_idx.shape[1]
+
+    def partners(self, drug_id, kind="high", k=None):
+        """
+        Up to k partners of drug_id as [{drug_id, probability}], highest
+        ("high") or lowest ("low") interaction probability first. None for
+        drugs the GNN has not seen.
+        """
+        i = self.row_by_id.get(drug_id)
+        if i is None:
+            return None
+        if kind == "high":
+            idx, prob = self.high_idx[i], self.high_prob[i]
+        elif kind == "low":
+            idx, prob = self.low_idx[i], self.low_prob[i]
+        else:
+            raise Exception(f"Unknown partner kind {kind!r} (use 'high' or 'low')")
+        k = self.k if k is None else max(0, min(k, self.k))
+        return [
+            {"drug_id": d, "probability": float(p)}
+            for d, p in zip(self.drug_ids[idx[:k]], prob[:k])
+        ]
+
+
+def load_gnn_topk():
+    """
+    The stored partner index, or None when it is missing or older than the
+    GNN export. Read-only: serving processes never rebuild it (that is the
+    offline `python gnn_topk.py` job).
+    """
+    if not gnn_topk_is_current():
+        print(f"{GNN_TOPK_FILE} is missing or older than the GNN export; "
+              "GNN partner lookups are disabled until `python gnn_topk.py` is run.")
+        return None
+    return GNNTopKIndex()
+
+
+def register():
+    """Register the read-only "gnn_topk" loader with app_state."""
+    app_state.loader("gnn_topk")(load_gnn_topk)
+
+
+if __name__ == "__main__":
+    build_gnn_topk()
+    index = GNNTopKIndex()
+    example = index.drug_ids[0]
+    print(f"Highest-risk partners of {example}: {index.partners(example, 'high', 5)}")
+    print(f"Lowest-risk partners of {example}: {index.partners(example, 'low', 5)}")
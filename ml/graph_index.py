@@ -0,0 +1,155 @@
+import os
+import numpy as np
+import pandas as pd
+import app_state
+
+# In-memory adjacency index over kg_interactions for /interaction_graph.
+#
+# Drugs get integer indexes; the (undirected) interaction graph is stored as
+# CSR arrays: the neighbours of node i are neighbors[indptr[i]:indptr[i+1]],
+# and edge_ids holds the kg_interactions row each of those entries came from.
+# A query only touches the adjacency slices of the nodes it returns, so its
+# cost depends on the size of the result, not on the 1M+ row edge table.
+
+GRAPH_MAX_NODES = int(os.environ.get("DDI_GRAPH_MAX_NODES", 200))
+GRAPH_MAX_EDGES = int(os.environ.get("DDI_GRAPH_MAX_EDGES", 1000))
+DEFAULT_SEED_NODES = 25  # highest-degree drugs shown when no drug_ids are given
+
+
+class InteractionGraphIndex:
+    def __init__(self, drugs_df, interactions_df):
+        edges = interactions_df.dropna(subset=["drug1_id", "drug2_id"])
+        drug_ids = pd.concat([
+            drugs_df["drug_id"].dropna().astype(object),
+            edges["drug1_id"].astype(object),
+            edges["drug2_id"].astype(object),
+        ], ignore_index=True)
+        codes, self.drug_ids = pd.factorize(drug_ids)
+        self.drug_ids = np.asarray(self.drug_ids, dtype=object)
+        self.index_by_id = {d: i for i, d in enumerate(self.drug_ids)}
+
+        n_drugs = drugs_df["drug_id"].notna().sum()
+        src = codes[n_drugs:n_drugs + len(edges)]
+        dst = codes[n_drugs + len(edges):]
+        self.edge_src = src
+        self.edge_dst = dst
+        severity_codes, severity_names = pd.factorize(edges["severity"].astype(object))
+        self.edge_severity = severity_codes
+        # missing severities have code -1, which picks the trailing None
+        self.severity_names = np.append(np.asarray(severity_names, dtype=object), None)
+
+        # both directions of every edge, grouped by source node
+        n_nodes = len(self.drug_ids)
+        both_src = np.concatenate([src, dst])
+        both_dst = np.concatenate([dst, src])
+        both_edge = np.concatenate([np.arange(len(src)), np.arange(len(src))])
+        order = np.argsort(both_src, kind="stable")
+        self.neighbors = both_dst[order]
+        self.edge_ids = both_edge[order]
+        self.indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(both_src, minlength=n_nodes), out=self.indptr[1:])
+        self.degree = np.diff(self.indptr)
+
+        # first row wins for duplicated drug_ids
+        first_rows = drugs_df.dropna(subset=["drug_id"]).drop_duplicates("drug_id")
+        names = first_rows["name"].astype(object)
+        classes = first_rows["drug_class"].astype(object)
+        self.label_by_id = dict(zip(first_rows["drug_id"], names.where(names.notna(), None)))
+        self.class_by_id = dict(zip(first_rows["drug_id"], classes.where(classes.notna(), None)))
+
+    def node_indexes(self, drug_ids):
+        """Indexes of the known drug_ids, in order, without duplicates."""
+        found = [self.index_by_id.get(d) for d in dict.fromkeys(drug_ids)]
+        return np.array([i for i in found if i is not None], dtype=np.int64)
+
+    def top_degree_nodes(self, k):
+        k = min(k, len(self.degree))
+        top = np.argpartition(-self.degree, k - 1)[:k] if k else np.empty(0, dtype=np.int64)
+        return top[np.argsort(-self.degree[top], kind="stable")]
+
+    def _adjacent(self, nodes):
+        """(neighbour, edge_id) arrays of every adjacency entry of nodes."""
+        if len(nodes) == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        slices = [slice(self.indptr[i], self.indptr[i + 1]) for i in nodes]
+        return (
+            np.concatenate([self.neighbors[s] for s in slices]),
+            np.concatenate([self.edge_ids[s] for s in slices]),
+        )
+
+    def expand(self, seeds, hops, max_nodes):
+        """
+        seeds plus their neighbours up to `hops` away, closest first, capped
+        at max_nodes. Returns (nodes, truncated).
+        """
+        nodes = list(seeds[:max_nodes])
+        seen = set(nodes)
+        truncated = len(seeds) > max_nodes
+        frontier = np.asarray(nodes, dtype=np.int64)
+        for _ in range(hops):
+            if truncated or len(frontier) == 0:
+                break
+            neighbours, _ = self._adjacent(frontier)
+            new = [n for n in pd.unique(neighbours) if n not in seen]
+            if len(nodes) + len(new) > max_nodes:
+                new = new[:max_nodes - len(nodes)]
+                truncated = True
+            nodes.extend(new)
+            seen.update(new)
+            frontier = np.asarray(new, dtype=np.int64)
+        return np.asarray(nodes, dtype=np.int64), truncated
+
+    def induced_edges(self, nodes):
+        """Sorted ids of the edges with both ends in nodes."""
+        neighbours, edge_ids = self._adjacent(nodes)
+        inside = np.isin(neighbours, nodes)
+        return np.unique(edge_ids[inside])
+
+    def subgraph(self, drug_ids=None, hops=0, max_nodes=GRAPH_MAX_NODES,
+                 max_edges=GRAPH_MAX_EDGES, offset=0):
+        """
+        {nodes, edges} for the induced subgraph of drug_ids (default: the
+        highest-degree drugs) plus their k-hop neighbours. Edges are paged:
+        pass the returned next_offset back as offset to get the next page.
+        """
+        max_nodes = max(0, min(max_nodes, GRAPH_MAX_NODES))
+        max_edges = max(0, min(max_edges, GRAPH_MAX_EDGES))
+        offset = max(0, offset)
+
+        seeds = self.node_indexes(drug_ids) if drug_ids else self.top_degree_nodes(DEFAULT_SEED_NODES)
+        nodes, truncated = self.expand(seeds, hops, max_nodes)
+        edge_ids = self.induced_edges(nodes)
+        page = edge_ids[offset:offset + max_edges]
+        next_offset = offset + len(page) if offset + len(page) < len(edge_ids) else None
+
+        node_ids = self.drug_ids[nodes]
+        return {
+            "nodes": [
+                {
+                    "id": d,
+                    "label": self.label_by_id.get(d) or d,
+                    "drug_class": self.class_by_id.get(d),
+                    "degree": int(deg),
+                }
+                for d, deg in zip(node_ids, self.degree[nodes])
+            ],
+            "edges": [
+                {"source": s, "target": t, "severity": sev}
+                for s, t, sev in zip(
+                    self.drug_ids[self.edge_src[page]],
+                    self.drug_ids[self.edge_dst[page]],
+                    self.severity_names[self.edge_severity[page]],
+                )
+            ],
+            "total_nodes": len(nodes),
+            "total_edges": len(edge_ids),
+            "offset": offset,
+            "next_offset": next_offset,
+            "truncated": truncated,
+        }
+
+
+@app_state.loader("graph_index")
+def load_graph_index():
+    return InteractionGraphIndex(app_state.get("kg_drugs"), app_state.get("kg_interactions"))
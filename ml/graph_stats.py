@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+import app_state
+from table_store import read_table, table_mtime, write_table
+
+# Per-drug statistics of the interaction graph, computed in one vectorized
+# pass over the kg_interactions edge arrays and stored as the graph_stats
+# table, so validation scripts, the GNN feature builder and the API read them
+# instead of rescanning the edges.
+#
+#   interaction_degree        kg_interactions rows touching the drug
+#   distinct_degree           distinct (drug1_id, drug2_id) rows touching the
+#                             drug with both ends in kg_drugs (the GNN graph)
+#   neighbor_count            distinct drugs it interacts with
+#   severity_weighted_degree  interaction_degree with severe=3, moderate=2,
+#                             other=1 (the risk score's pair points)
+#   severe_neighbors          distinct drugs it has a severe interaction with
+#
+# python graph_stats.py recomputes and saves the table (offline scripts that
+# call load_graph_stats also rebuild a stale one); the API only reads it.
+
+STATS_COLUMNS = [
+    "drug_id",
+    "in_kg_drugs",
+    "interaction_degree",
+    "distinct_degree",
+    "neighbor_count",
+    "severity_weighted_degree",
+    "severe_neighbors",
+]
+
+
+def severity_points(severities):
+    """3 / 2 / 1 per severity label, same rule as risk_scoring.count_severities."""
+    lower = severities.astype(object).fillna("").astype(str).str.lower()
+    points = np.ones(len(lower), dtype=np.int64)
+    points[lower.str.contains("moderate", regex=False).to_numpy()] = 2
+    points[lower.str.contains("severe", regex=False).to_numpy()] = 3
+    return points
+
+
+def _count_distinct(a, b, n):
+    """Per node in a: number of distinct (a, b) pairs."""
+    if len(a) == 0:
+        return np.zeros(n, dtype=np.int64)
+    keys = np.unique(a.astype(np.int64) * n + b)
+    return np.bincount(keys // n, minlength=n)
+
+
+def compute_graph_stats(drugs_df, interactions_df):
+    edges = interactions_df.dropna(subset=["drug1_id", "drug2_id"])
+    known_ids = pd.Index(drugs_df["drug_id"].dropna().astype(object).unique())
+
+    # node codes: kg_drugs first (in order), then ids only seen in edges
+    codes, node_ids = pd.factorize(pd.concat([
+        pd.Series(known_ids, dtype=object),
+        edges["drug1_id"].astype(object),
+        edges["drug2_id"].astype(object),
+    ], ignore_index=True))
+    n = len(node_ids)
+    n_known = len(known_ids)
+    src = codes[n_known:n_known + len(edges)]
+    dst = codes[n_known + len(edges):]
+    points = severity_points(edges["severity"]) if "severity" in edges else np.ones(len(src), dtype=np.int64)
+
+    interaction_degree = np.bincount(src, minlength=n) + np.bincount(dst, minlength=n)
+    severity_weighted = (
+        np.bincount(src, weights=points, minlength=n)
+        + np.bincount(dst, weights=points, minlength=n)
+    ).astype(np.int64)
+
+    # distinct ordered rows between known drugs, counted at both ends
+    known = (src < n_known) & (dst < n_known)
+    keys = np.unique(src[known].astype(np.int64) * n + dst[known])
+    distinct_degree = np.bincount(keys // n, minlength=n) + np.bincount(keys % n, minlength=n)
+
+    both_a = np.concatenate([src, dst])
+    both_b = np.concatenate([dst, src])
+    neighbor_count = _count_distinct(both_a, both_b, n)
+    severe = np.concatenate([points == 3, points == 3])
+    severe_neighbors = _count_distinct(both_a[severe], both_b[severe], n)
+
+    return pd.DataFrame({
+        "drug_id": np.asarray(node_ids, dtype=object),
+        "in_kg_drugs": np.arange(n) < n_known,
+        "interaction_degree": interaction_degree,
+        "distinct_degree": distinct_degree,
+        "neighbor_count": neighbor_count,
+        "severity_weighted_degree": severity_weighted,
+        "severe_neighbors": severe_neighbors,
+    }, columns=STATS_COLUMNS)
+
+
+def build_graph_stats():
+    drugs = read_table("kg_drugs", columns=["drug_id"])
+    interactions = read_table("kg_interactions", columns=["drug1_id", "drug2_id", "severity"])
+    stats = compute_graph_stats(drugs, interactions)
+    write_table(stats, "graph_stats")
+    return stats
+
+
+def graph_stats_are_current():
+    stats_mtime = table_mtime("graph_stats")
+    if stats_mtime is None:
+        return False
+    sources = [table_mtime("kg_drugs"), table_mtime("kg_interactions")]
+    return all(m is None or m <= stats_mtime for m in sources)
+
+
+def load_graph_stats():
+    """
+    The stored graph_stats table, rebuilt first if the kg tables are newer.
+    For offline scripts only; the API reads it through the graph_stats loader.
+    """
+    if not graph_stats_are_current():
+        print("graph_stats is missing or older than the kg tables; rebuilding it.")
+        return build_graph_stats()
+    return read_table("graph_stats")
+
+
+class GraphStats:
+    """Per-drug lookup over the graph_stats table."""
+
+    def __init__(self, stats):
+        self.frame = stats
+        self.row_by_id = {d: i for i, d in enumerate(stats["drug_id"])}
+
+    def lookup(self, drug_id):
+        """Stats of one drug as a dict, or None for drugs not in the graph."""
+        i = self.row_by_id.get(drug_id)
+        if i is None:
+            return None
+        row = self.frame.iloc[i]
+        return {
+            col: (row[col].item() if hasattr(row[col], "item") else row[col])
+            for col in STATS_COLUMNS
+        }
+
+    def column(self, name, drug_ids, fill_value=0):
+        """One stat for many drugs, as an array aligned with drug_ids."""
+        idx = pd.Index(self.frame["drug_id"]).get_indexer(pd.Index(drug_ids, dtype=object))
+        values = self.frame[name].to_numpy()[np.maximum(idx, 0)]
+        return np.where(idx >= 0, values, fill_value)
+
+
+def load_graph_stats_lookup():
+    """
+    Read-only lookup for the API: never rebuilds or writes the table, so
+    concurrent workers don't race on it. None when the table is missing.
+    """
+    if table_mtime("graph_stats") is None:
+        print("graph_stats table not found; run `python graph_stats.py`. /drug_stats is disabled.")
+        return None
+    if not graph_stats_are_current():
+        print("graph_stats is older than the kg tables; serving it anyway. Run `python graph_stats.py` to refresh it.")
+    return GraphStats(read_table("graph_stats"))
+
+
+def register():
+    """Register the read-only "graph_stats" loader with app_state (the API does this)."""
+    app_state.loader("graph_stats")(load_graph_stats_lookup)
+
+
+if __name__ == "__main__":
+    stats = build_graph_stats()
+    print(f"Saved graph_stats for {len(stats)} drugs")
+    print(stats.sort_values("interaction_degree", ascending=False).head(10))
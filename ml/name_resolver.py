@@ -0,0 +1,229 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import joblib
+from table_store import DATA_DIR, read_table, table_mtime
+
+# FAERS drug string -> DrugBank drug_id.
+#
+# FAERS names are free text ("LIPITOR", "ATORVASTATIN CALCIUM 10MG TABLET"),
+# so exact equality with drugs["name"] misses most of them. Each name goes
+# through, in order:
+#   exact          upper-cased/stripped name equals a DrugBank name
+#   alias          normalized name (dose, dosage form, punctuation and
+#                  bracketed text removed) equals a normalized DrugBank name,
+#                  synonym, salt, international brand or product name
+#                  (the drug_names table, see kg/extract_drugbank.py)
+#   base           the same after dropping salt words (HYDROCHLORIDE, SODIUM, ...)
+#   fuzzy          best character-trigram Jaccard similarity >= FUZZY_THRESHOLD,
+#                  with the same digits (so DRUGNAME12 never becomes DRUGNAME21)
+#
+# Resolution runs once per distinct name, and the results are kept in an
+# on-disk cache that is dropped whenever the drug tables or the settings
+# change, so later runs only resolve names they have not seen.
+
+NAME_CACHE_FILE = os.path.join(DATA_DIR, "name_resolver_cache.joblib")
+FUZZY_THRESHOLD = float(os.environ.get("DDI_NAME_FUZZY_THRESHOLD", 0.8))
+MIN_FUZZY_LENGTH = 5  # shorter strings have too few trigrams to compare
+RESOLVER_VERSION = 1  # bump when the matching rules change, to drop old caches
+
+# when several drugs share an alias, the earlier source wins
+SOURCE_PRIORITY = ["name", "salt", "synonym", "brand", "product"]
+
+DOSE_PATTERN = r"\b\d+(?:[.,]\d+)?\s*(?:MG|MCG|UG|G|KG|ML|L|IU|UNITS?|MEQ|MMOL|%)(?:\s*/\s*\d*(?:\.\d+)?\s*(?:ML|L|G|H|HR|DOSE|ACTUATION))?(?=\W|$)"
+FORM_WORDS = [
+    "TABLET", "TABLETS", "TAB", "TABS", "CAPSULE", "CAPSULES", "CAP", "CAPS",
+    "INJECTION", "INJECTABLE", "SOLUTION", "SUSPENSION", "SYRUP", "ORAL",
+    "CREAM", "OINTMENT", "GEL", "PATCH", "SPRAY", "DROPS", "POWDER",
+    "INHALER", "INHALATION", "INTRAVENOUS", "IV", "EXTENDED", "DELAYED",
+    "RELEASE", "ER", "XR", "SR", "CR", "XL", "DR", "FILM", "COATED",
+]
+SALT_WORDS = [
+    "HYDROCHLORIDE", "HCL", "DIHYDROCHLORIDE", "HYDROBROMIDE", "SODIUM",
+    "POTASSIUM", "CALCIUM", "MAGNESIUM", "SULFATE", "SULPHATE", "MESYLATE",
+    "MALEATE", "TARTRATE", "BITARTRATE", "CITRATE", "ACETATE", "PHOSPHATE",
+    "BESYLATE", "FUMARATE", "SUCCINATE", "BROMIDE", "CHLORIDE", "NITRATE",
+    "HYCLATE", "MONOHYDRATE", "DIHYDRATE", "TRIHYDRATE", "HYDRATE", "ANHYDROUS",
+]
+FORM_PATTERN = r"\b(?:" + "|".join(FORM_WORDS) + r")\b"
+SALT_PATTERN = r"\b(?:" + "|".join(SALT_WORDS) + r")\b"
+
+
+def upper_keys(names):
+    """str(name).upper().strip() for a whole column (missing -> "NAN")."""
+    return pd.Series(names, dtype=object).astype(str).str.upper().str.strip()
+
+
+def normalize_names(keys):
+    """Normalized form of upper-cased names (a pandas Series)."""
+    s = keys.str.replace(r"\([^)]*\)|\[[^\]]*\]", " ", regex=True)
+    s = s.str.replace(DOSE_PATTERN, " ", regex=True)
+    s = s.str.replace(r"[^A-Z0-9]+", " ", regex=True)
+    s = s.str.replace(FORM_PATTERN, " ", regex=True)
+    return s.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def base_names(normalized):
+    """Normalized names without salt words."""
+    s = normalized.str.replace(SALT_PATTERN, " ", regex=True)
+    return s.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def trigrams(s):
+    padded = f" {s} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def digits(s):
+    return "".join(ch for ch in s if ch.isdigit())
+
+
+class TrigramIndex:
+    """Inverted index trigram -> alias rows, as CSR arrays."""
+
+    def __init__(self, strings):
+        self.strings = list(strings)
+        grams = [trigrams(s) for s in self.strings]
+        self.size = np.array([len(g) for g in grams], dtype=np.int64)
+
+        rows = np.repeat(np.arange(len(grams)), self.size)
+        codes, vocab = pd.factorize(pd.Series([t for g in grams for t in g], dtype=object))
+        self.code_by_gram = {t: i for i, t in enumerate(vocab)}
+        order = np.argsort(codes, kind="stable")
+        self.postings = rows[order]
+        self.indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(vocab)), out=self.indptr[1:])
+
+    def best(self, s, min_similarity, accept=lambda row: True):
+        """
+        (row, Jaccard similarity) of the most similar string with similarity
+        >= min_similarity that accept(row) allows, or (None, best similarity).
+        """
+        codes = [self.code_by_gram[t] for t in trigrams(s) if t in self.code_by_gram]
+        if not codes:
+            return None, 0.0
+        hits = np.concatenate([self.postings[self.indptr[c]:self.indptr[c + 1]] for c in codes])
+        rows, shared = np.unique(hits, return_counts=True)
+        similarity = shared / (len(trigrams(s)) + self.size[rows] - shared)
+        for k in np.argsort(-similarity, kind="stable"):
+            if similarity[k] < min_similarity:
+                break
+            if accept(int(rows[k])):
+                return int(rows[k]), float(similarity[k])
+        return None, float(similarity.max())
+
+
+class NameResolver:
+    def __init__(self, aliases, fuzzy_threshold=FUZZY_THRESHOLD):
+        """aliases: DataFrame of drug_id, name, source (see load_aliases)."""
+        rank = aliases["source"].map({s: i for i, s in enumerate(SOURCE_PRIORITY)})
+        aliases = aliases.assign(rank=rank.fillna(len(SOURCE_PRIORITY)))
+        aliases = aliases.sort_values("rank", kind="stable")
+
+        names = aliases[aliases["source"] == "name"]
+        upper = upper_keys(names["name"])
+        # same rule as the old exact match: the last row of a repeated name wins
+        self.exact = dict(zip(upper, names["drug_id"]))
+
+        normalized = normalize_names(upper_keys(aliases["name"]))
+        self.alias = self._first_by_key(normalized, aliases["drug_id"])
+        self.base = self._first_by_key(base_names(normalized), aliases["drug_id"])
+        self.fuzzy_keys = list(self.alias)
+        self.fuzzy_ids = [self.alias[k] for k in self.fuzzy_keys]
+        self.fuzzy_index = TrigramIndex(self.fuzzy_keys)
+        self.fuzzy_threshold = fuzzy_threshold
+
+    @staticmethod
+    def _first_by_key(keys, drug_ids):
+        keep = (keys != "").to_numpy()
+        table = {}
+        for key, drug_id in zip(keys[keep], drug_ids[keep]):
+            table.setdefault(key, drug_id)
+        return table
+
+    def resolve_keys(self, keys):
+        """
+        keys: distinct upper-cased names. Returns a list of
+        (drug_id, match, score); drug_id and match are None for unmatched
+        names, whose score is the best fuzzy similarity seen.
+        """
+        keys = pd.Series(keys, dtype=object)
+        normalized = normalize_names(keys)
+        base = base_names(normalized)
+
+        results = []
+        for key, norm, b in zip(keys, normalized, base):
+            if key in self.exact:
+                results.append((self.exact[key], "exact", 1.0))
+            elif norm in self.alias:
+                results.append((self.alias[norm], "alias", 1.0))
+            elif b in self.base:
+                results.append((self.base[b], "base", 1.0))
+            elif len(norm) >= MIN_FUZZY_LENGTH:
+                wanted = digits(norm)
+                row, score = self.fuzzy_index.best(
+                    norm, self.fuzzy_threshold, lambda r: digits(self.fuzzy_keys[r]) == wanted
+                )
+                if row is not None:
+                    results.append((self.fuzzy_ids[row], "fuzzy", score))
+                else:
+                    results.append((None, None, score))
+            else:
+                results.append((None, None, 0.0))
+        return results
+
+
+def load_aliases():
+    """DrugBank names plus the drug_names aliases, as drug_id, name, source."""
+    drugs = read_table("drugs", columns=["drug_id", "name"]).dropna(subset=["drug_id", "name"])
+    aliases = [drugs.assign(source="name")[["drug_id", "name", "source"]]]
+    if table_mtime("drug_names") is None:
+        print("drug_names table not found (run kg/extract_drugbank.py); matching on drug names only.")
+    else:
+        names = read_table("drug_names", columns=["drug_id", "name", "source"])
+        names = names.astype({"drug_id": object, "source": object})
+        aliases.append(names[names["source"] != "name"])
+    return pd.concat(aliases, ignore_index=True)
+
+
+def cache_version():
+    return (RESOLVER_VERSION, table_mtime("drugs"), table_mtime("drug_names"), FUZZY_THRESHOLD)
+
+
+def load_cache():
+    if os.path.exists(NAME_CACHE_FILE):
+        cache = joblib.load(NAME_CACHE_FILE)
+        if cache.get("version") == cache_version():
+            return cache["resolved"]
+    return {}
+
+
+def resolve_names(names, use_cache=True):
+    """
+    DrugBank ids for a column of FAERS drug names. Returns a DataFrame
+    aligned with names: drug_id and match (missing if unmatched), score.
+    """
+    start = time.perf_counter()
+    codes, uniques = pd.factorize(upper_keys(names))
+    resolved = load_cache() if use_cache else {}
+
+    missing = [k for k in uniques if k not in resolved]
+    if missing:
+        resolver = NameResolver(load_aliases())
+        resolved.update(zip(missing, resolver.resolve_keys(missing)))
+        if use_cache:
+            joblib.dump({"version": cache_version(), "resolved": resolved}, NAME_CACHE_FILE)
+
+    table = pd.DataFrame([resolved[k] for k in uniques], columns=["drug_id", "match", "score"])
+    result = table.iloc[codes].reset_index(drop=True) if len(codes) else table.iloc[:0]
+    seconds = time.perf_counter() - start
+    print(f"Resolved {len(codes)} names ({len(uniques)} distinct, {len(missing)} new) "
+          f"in {seconds:.2f}s; matched {result['drug_id'].notna().mean() * 100 if len(result) else 0:.1f}%")
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    for name, (drug_id, match, score) in zip(sys.argv[1:], resolve_names(sys.argv[1:]).itertuples(index=False)):
+        print(f"{name!r} -> {drug_id} ({match}, {score:.2f})")
@@ -0,0 +1,161 @@
+import os
+import sys
+import itertools
+import threading
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+
+# Memoized pair severities for risk_scoring.
+#
+# Keys are unordered: (A, B) and (B, A) share one entry. The model features
+# are ordered (class1_enc, class2_enc), so an entry keeps the result for both
+# orientations and a lookup returns exactly what the model would return for
+# the orientation asked for.
+#
+# Each entry is tagged with the artifact version (mtimes of the model and
+# encoder files) it was computed with. risk_scoring re-checks those mtimes
+# every DDI_ARTIFACT_CHECK_SECONDS and reloads the scorer when they change, so
+# a retrained model is picked up without a restart; a cache shared between
+# processes is cleared as soon as a process loaded from newer artifacts uses it.
+
+DEFAULT_MAX_PAIRS = 100_000
+
+
+def artifact_version(paths):
+    """(path, mtime) for every existing file in paths."""
+    return tuple((p, os.path.getmtime(p)) for p in paths if os.path.exists(p))
+
+
+class PairSeverityCache:
+    """
+    Bounded LRU cache: pair_key(d1, d2) -> (result for (lo, hi), result for (hi, lo)).
+    A result is whatever the scorer returns for one pair, e.g. (label, probs).
+    Thread-safe: API handler threads and the manager's connection threads
+    share one instance.
+    """
+
+    def __init__(self, max_pairs=DEFAULT_MAX_PAIRS, version=None):
+        self.max_pairs = max_pairs
+        self.version = version
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self.version:
+            self.entries.clear()
+            self.version = version
+
+    def get_many(self, pairs, version=None):
+        """Cached result per pair, or None for misses. Hits become most recent."""
+        results = []
+        with self.lock:
+            self._check_version(version)
+            for d1, d2 in pairs:
+                key = pair_key(d1, d2)
+                entry = self.entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self.hits += 1
+                self.entries.move_to_end(key)
+                results.append(entry[0] if key[0] == d1 else entry[1])
+        return results
+
+    def put_many(self, items, version=None):
+        """items: ((lo, hi), forward_result, reverse_result) with lo, hi from pair_key."""
+        with self.lock:
+            self._check_version(version)
+            if self.max_pairs <= 0:
+                return
+            for key, forward, reverse in items:
+                self.entries[key] = (forward, reverse)
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_pairs:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_pairs": self.max_pairs,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def pair_key(d1, d2):
+    return (d1, d2) if d1 <= d2 else (d2, d1)
+
+
+class PairCacheManager(BaseManager):
+    pass
+
+
+PairCacheManager.register("PairSeverityCache", PairSeverityCache)
+
+
+def start_shared_cache(max_pairs=DEFAULT_MAX_PAIRS, version=None):
+    """
+    One cache living in a manager process; the returned proxy can be used from
+    any process forked after this call (e.g. API workers). Keep the manager
+    referenced for as long as the cache is in use.
+    """
+    manager = PairCacheManager()
+    manager.start()
+    return manager, manager.PairSeverityCache(max_pairs, version)
+
+
+def check_concurrent_use(threads=16, rounds=500, max_pairs=30, batch=12):
+    """
+    Regression check: many threads doing get_many / put_many on a cache just
+    smaller than the working set (hits and evictions interleave) must not
+    raise, and every lookup must be counted.
+    """
+    cache = PairSeverityCache(max_pairs)
+    drugs = [f"DB{i:05d}" for i in range(9)]
+    pairs = list(itertools.combinations(drugs, 2))  # 36 pairs
+    errors = []
+
+    def work(seed):
+        try:
+            for r in range(rounds):
+                wanted = [pairs[(seed + r + k) % len(pairs)] for k in range(batch)]
+                found = cache.get_many(wanted)
+                cache.put_many([(pair_key(a, b), (a, b), (b, a))
+                                for (a, b), hit in zip(wanted, found) if hit is None])
+        except Exception as e:
+            errors.append(e)
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible
+    try:
+        workers = [threading.Thread(target=work, args=(seed,)) for seed in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    if errors:
+        raise Exception(f"concurrent cache use failed: {errors[0]!r}")
+    stats = cache.stats()
+    if stats["hits"] + stats["misses"] != threads * rounds * batch or stats["size"] > max_pairs:
+        raise Exception(f"inconsistent cache counters: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    print("Concurrent use OK:", check_concurrent_use())
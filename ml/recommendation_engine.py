@@ -1,60 +1,143 @@
+import os
+import itertools
 import pandas as pd
-from risk_scoring import compute_regimen_risk, get_drug_class
+import app_state
+import gnn_topk
+from risk_scoring import (
+    count_severities,
+    get_drug_class,
+    predict_pairs_severity,
+    risk_score_from_counts,
+)
 
-# Load drugs metadata
-drugs_df = pd.read_csv("../data_processed/drugs.csv")
+gnn_topk.register()  # get_gnn_candidates reads app_state "gnn_topk"
 
+# Candidate pool per request; raise it to look at more same-class drugs
+MAX_CANDIDATES = int(os.environ.get("DDI_MAX_CANDIDATES", 20))
 
-def get_candidate_alternatives(target_drug_id: str, max_candidates: int = 20):
+# Where candidates come from: "class" (same-class drugs) or "gnn" (drugs the
+# GNN top-k index lists as lowest-risk next to the rest of the regimen,
+# falling back to "class" when the index is unavailable)
+CANDIDATE_SOURCE = os.environ.get("DDI_CANDIDATE_SOURCE", "class")
+
+
+class CandidateIndex:
+    """
+    class -> distinct drug_ids in file order (what the old per-request
+    drug_class filter + unique() produced), and every distinct drug_id for
+    the fallback path. Built once from the shared drugs table.
+    """
+
+    def __init__(self, drugs_df):
+        drug_ids_by_class = {}
+        for drug_id, drug_class in zip(drugs_df["drug_id"], drugs_df["drug_class"]):
+            if pd.isna(drug_id) or pd.isna(drug_class):
+                continue
+            drug_ids_by_class.setdefault(str(drug_class), {})[drug_id] = None
+        self.drug_ids_by_class = {c: list(ids) for c, ids in drug_ids_by_class.items()}
+        self.all_drug_ids = drugs_df["drug_id"].dropna().unique().tolist()
+
+
+@app_state.loader("candidate_index")
+def load_candidate_index():
+    return CandidateIndex(app_state.get("drugs"))
+
+
+def _first_other(drug_ids, exclude_id, limit):
+    """First `limit` ids other than exclude_id, without copying the list."""
+    return list(itertools.islice((d for d in drug_ids if d != exclude_id), limit))
+
+
+def get_candidate_alternatives(target_drug_id: str, max_candidates: int = MAX_CANDIDATES):
     """
     Return up to max_candidates drugs with the same class as target.
     If none are found, fall back to any other drugs (so that the
     recommendation engine always returns something for demo purposes).
     """
+    index = app_state.get("candidate_index")
     target_class = get_drug_class(target_drug_id)
     print("Target drug:", target_drug_id, "| class:", target_class)
 
     same_class = []
     if target_class != "UNKNOWN":
-        same_class = drugs_df[
-            (drugs_df["drug_class"] == target_class) &
-            (drugs_df["drug_id"] != target_drug_id)
-        ]["drug_id"].dropna().unique().tolist()
+        class_ids = index.drug_ids_by_class.get(target_class, [])
+        same_class = _first_other(class_ids, target_drug_id, max_candidates)
 
     if same_class:
-        print("Found", len(same_class), "same-class candidates.")
-        return same_class[:max_candidates]
+        # the target itself is always a member of its own class
+        print("Found", len(class_ids) - 1, "same-class candidates.")
+        return same_class
 
     # Fallback: pick any other drugs so we can still show recommendations
     print("No same-class candidates found; using fallback candidates.")
-    fallback = drugs_df[drugs_df["drug_id"] != target_drug_id]["drug_id"].dropna().unique().tolist()
-    return fallback[:max_candidates]
+    return _first_other(index.all_drug_ids, target_drug_id, max_candidates)
+
+
+def get_gnn_candidates(base_regimen, target_drug_id, max_candidates: int = MAX_CANDIDATES):
+    """
+    Drugs in the precomputed lowest-risk partner lists (gnn_topk.py) of the
+    base regimen, ranked by how many base drugs list them and then by their
+    worst listed probability. O(len(base_regimen) * k); returns [] when the
+    index is unavailable or knows none of the base drugs.
+    """
+    index = app_state.get("gnn_topk")
+    if index is None:
+        return []
+
+    listed = {}
+    for b in base_regimen:
+        for partner in index.partners(b, "low") or []:
+            d = partner["drug_id"]
+            if d == target_drug_id or d in base_regimen:
+                continue
+            count, worst = listed.get(d, (0, 0.0))
+            listed[d] = (count + 1, max(worst, partner["probability"]))
+
+    ranked = sorted(listed, key=lambda d: (-listed[d][0], listed[d][1]))
+    return ranked[:max_candidates]
 
 
-def recommend_alternatives(current_regimen, target_drug_id, top_k=3):
+def recommend_alternatives(current_regimen, target_drug_id, top_k=3,
+                           max_candidates: int = MAX_CANDIDATES):
     """
     current_regimen: list of current drug_ids.
     target_drug_id: the drug we want to replace.
+    max_candidates: size of the candidate pool that gets scored.
     """
     if target_drug_id not in current_regimen:
         print("Target drug not in regimen.")
         return []
 
     base_regimen = [d for d in current_regimen if d != target_drug_id]
-    candidates = get_candidate_alternatives(target_drug_id)
+    candidates = []
+    if CANDIDATE_SOURCE == "gnn":
+        candidates = get_gnn_candidates(base_regimen, target_drug_id, max_candidates)
+    elif CANDIDATE_SOURCE != "class":
+        raise Exception(f"Unknown DDI_CANDIDATE_SOURCE {CANDIDATE_SOURCE!r} (use 'class' or 'gnn')")
+    if not candidates:
+        candidates = get_candidate_alternatives(target_drug_id, max_candidates)
 
     print("Number of candidate alternatives found:", len(candidates))
 
+    # base_regimen + [alt] only adds the pairs (b, alt): score the base pairs
+    # once, then every candidate's new pairs together in one batch
+    base_labels, _ = predict_pairs_severity(list(itertools.combinations(base_regimen, 2)))
+    base_counts = count_severities(base_labels)
+
+    new_pairs = [(b, alt) for alt in candidates for b in base_regimen]
+    new_labels, _ = predict_pairs_severity(new_pairs)
+    n_base = len(base_regimen)
+
     results = []
-    for alt in candidates:
-        new_regimen = base_regimen + [alt]
-        risk_info = compute_regimen_risk(new_regimen)
+    for k, alt in enumerate(candidates):
+        alt_counts = count_severities(new_labels[k * n_base:(k + 1) * n_base])
+        severe, moderate, unknown = (b + a for b, a in zip(base_counts, alt_counts))
         results.append({
             "alternative_drug_id": alt,
-            "risk_score": risk_info["risk_score"],
-            "severe_pairs": risk_info["severe_pairs"],
-            "moderate_pairs": risk_info["moderate_pairs"],
-            "unknown_pairs": risk_info["unknown_pairs"]
+            "risk_score": risk_score_from_counts(severe, moderate, unknown),
+            "severe_pairs": severe,
+            "moderate_pairs": moderate,
+            "unknown_pairs": unknown
         })
 
     # Sort alternatives by lowest risk score
@@ -1,41 +1,261 @@
+import os
+import time
 import itertools
 import joblib
+import numpy as np
 import pandas as pd
+import app_state
+from pair_cache import (
+    DEFAULT_MAX_PAIRS,
+    PairSeverityCache,
+    artifact_version,
+    pair_key,
+    start_shared_cache,
+)
+from gnn_inference import gnn_artifact_version, load_gnn_scorer
+from severity_table import (
+    CLASS_ENCODER_FILE,
+    MODEL_FILE,
+    SEVERITY_ENCODER_FILE,
+    SEVERITY_TABLE_FILE,
+    load_severity_table,
+    severity_table_is_current,
+)
 
-# LOAD MODEL & ENCODERS (you already have this above)
-model = joblib.load("../data_processed/rf_interaction_model.joblib")
-class_encoder = joblib.load("../data_processed/class_encoder.joblib")
-severity_encoder = joblib.load("../data_processed/severity_encoder.joblib")
+# Pair cache size (0 disables it); set DDI_PAIR_CACHE_SHARED=1 to share one
+# cache between all processes forked after it is first loaded (the API loads
+# it before starting its scoring workers, see pair_cache.py)
+PAIR_CACHE_SIZE = int(os.environ.get("DDI_PAIR_CACHE_SIZE", DEFAULT_MAX_PAIRS))
+PAIR_CACHE_SHARED = os.environ.get("DDI_PAIR_CACHE_SHARED", "0") == "1"
 
-drugs_df = pd.read_csv("../data_processed/drugs.csv")
+# Pair scorer behind compute_regimen_risk: "rf" (class-pair RandomForest /
+# severity table) or "gnn" (exported GCN embeddings, see gnn_inference.py)
+PAIR_SCORER = os.environ.get("DDI_PAIR_SCORER", "rf")
+
+# How often (seconds) predict_pairs_severity checks the scorer's files on disk;
+# when they changed, the scorer and encoders are reloaded and the pair cache
+# starts over. 0 checks on every call, a negative value never checks.
+ARTIFACT_CHECK_SECONDS = float(os.environ.get("DDI_ARTIFACT_CHECK_SECONDS", 5))
+
+_pair_cache_manager = None
+
+@app_state.loader("pair_cache")
+def load_pair_cache():
+    """
+    The pair cache; with DDI_PAIR_CACHE_SHARED=1 this starts the manager
+    process that holds it, so it only happens when something scores pairs.
+    """
+    global _pair_cache_manager
+    if _pair_cache_manager is not None:
+        _pair_cache_manager.shutdown()
+        _pair_cache_manager = None
+    if PAIR_CACHE_SHARED and PAIR_CACHE_SIZE > 0:
+        _pair_cache_manager, cache = start_shared_cache(PAIR_CACHE_SIZE)
+        return cache
+    return PairSeverityCache(PAIR_CACHE_SIZE)
+
+# Model, encoders and indexes are loaded through app_state on first use (or
+# by app_state.warm_up()), once per process.
+
+class SeverityScorer:
+    """
+    The severity table, or the RandomForest when the table is missing or
+    older than the model, plus the version of the files it was loaded from
+    (cached pair results are only valid for that version).
+    """
+
+    def __init__(self, severity_table, model, version):
+        self.severity_table = severity_table
+        self.model = model
+        self.version = version
+
+    def score_pairs(self, pairs):
+        """
+        Builds the whole feature matrix at once and either indexes the
+        severity table or runs a single predict_proba; labels are taken from
+        the same probabilities (this is what model.predict does internally),
+        so results match one-pair-at-a-time scoring exactly.
+        """
+        class_code = app_state.get("drug_class_index").class_code
+
+        X = pd.DataFrame(
+            [[class_code(d1), class_code(d2)] for d1, d2 in pairs],
+            columns=["class1_enc", "class2_enc"],
+        )
+
+        if self.severity_table is not None:
+            severity_labels, y_prob = self.severity_table.lookup(
+                X["class1_enc"].to_numpy(), X["class2_enc"].to_numpy()
+            )
+            return list(severity_labels), y_prob
+
+        y_prob = self.model.predict_proba(X)
+        y_pred = self.model.classes_.take(y_prob.argmax(axis=1))
+
+        severity_labels = app_state.get("severity_encoder").inverse_transform(y_pred)
+        return list(severity_labels), y_prob
+
+def severity_artifact_version():
+    return artifact_version(
+        [MODEL_FILE, CLASS_ENCODER_FILE, SEVERITY_ENCODER_FILE, SEVERITY_TABLE_FILE]
+    )
+
+def load_severity_scorer():
+    version = severity_artifact_version()  # before loading, so a mid-load swap is seen later
+    class_encoder = app_state.get("class_encoder")
+
+    # Prefer the precomputed class-pair table (see severity_table.py)
+    severity_table = None
+    model = None
+    if severity_table_is_current():
+        severity_table = load_severity_table()
+        if severity_table.n_classes != len(class_encoder.classes_):
+            print(f"{SEVERITY_TABLE_FILE} does not match class_encoder; using the model instead.")
+            severity_table = None
+    if severity_table is None:
+        model = joblib.load(MODEL_FILE)
+
+    return SeverityScorer(severity_table, model, version)
+
+@app_state.loader("pair_scorer")
+def load_pair_scorer():
+    if PAIR_SCORER == "gnn":
+        return load_gnn_scorer()
+    if PAIR_SCORER != "rf":
+        raise Exception(f"Unknown DDI_PAIR_SCORER {PAIR_SCORER!r} (use 'rf' or 'gnn')")
+    return load_severity_scorer()
+
+# artifacts derived from the scorer's files, reloaded together when they change
+SCORER_ARTIFACTS = ["pair_scorer", "class_encoder", "severity_encoder", "drug_class_index"]
+_last_artifact_check = time.monotonic()
+
+def current_pair_scorer():
+    """
+    The loaded pair scorer, reloaded first (at most every
+    ARTIFACT_CHECK_SECONDS) if its model / encoder / table files have been
+    replaced since it was loaded.
+    """
+    global _last_artifact_check
+    scorer = app_state.get("pair_scorer")
+    now = time.monotonic()
+    if ARTIFACT_CHECK_SECONDS < 0 or now - _last_artifact_check < ARTIFACT_CHECK_SECONDS:
+        return scorer
+    _last_artifact_check = now
+
+    on_disk = gnn_artifact_version() if PAIR_SCORER == "gnn" else severity_artifact_version()
+    if on_disk != scorer.version:
+        print("Scoring artifacts changed on disk; reloading them.")
+        app_state.reset(SCORER_ARTIFACTS)
+        app_state.get("pair_cache").clear()
+        scorer = app_state.get("pair_scorer")
+    return scorer
+
+# LabelEncoder codes are the positions in classes_, so no transform() call is
+# needed per lookup. Classes the encoder has never seen fall back to
+# classes_[0] (code 0), resolved here once instead of on every request.
+FALLBACK_CLASS_CODE = 0
+
+class DrugClassIndex:
+    def __init__(self, drugs_df, class_encoder):
+        self.class_code_by_name = {c: i for i, c in enumerate(class_encoder.classes_)}
+        self.unknown_class_code = self.class_code_by_name.get("UNKNOWN", FALLBACK_CLASS_CODE)
+
+        # first row wins for duplicated drug_ids, same as the old DataFrame filter
+        first_rows = drugs_df.dropna(subset=["drug_id"]).drop_duplicates("drug_id")
+        self.drug_class_by_id = {
+            drug_id: str(drug_class)
+            for drug_id, drug_class in zip(first_rows["drug_id"], first_rows["drug_class"])
+        }
+        self.drug_class_code_by_id = {
+            drug_id: self.class_code_by_name.get(drug_class, FALLBACK_CLASS_CODE)
+            for drug_id, drug_class in self.drug_class_by_id.items()
+        }
+
+    def class_code(self, drug_id):
+        return self.drug_class_code_by_id.get(drug_id, self.unknown_class_code)
+
+@app_state.loader("drug_class_index")
+def load_drug_class_index():
+    return DrugClassIndex(app_state.get("drugs"), app_state.get("class_encoder"))
 
 def get_drug_class(drug_id: str) -> str:
-    row = drugs_df[drugs_df["drug_id"] == drug_id]
-    if row.empty:
-        return "UNKNOWN"
-    return str(row.iloc[0]["drug_class"])
+    return app_state.get("drug_class_index").drug_class_by_id.get(drug_id, "UNKNOWN")
+
+def get_drug_class_code(drug_id: str) -> int:
+    """Encoded class of a drug, O(1). Unknown drugs get the UNKNOWN class code."""
+    return app_state.get("drug_class_index").class_code(drug_id)
 
 def encode_classes(class1: str, class2: str):
-    if class1 not in class_encoder.classes_:
-        class1 = class_encoder.classes_[0]
-    if class2 not in class_encoder.classes_:
-        class2 = class_encoder.classes_[0]
-    c1_enc = class_encoder.transform([class1])[0]
-    c2_enc = class_encoder.transform([class2])[0]
+    class_code_by_name = app_state.get("drug_class_index").class_code_by_name
+    c1_enc = class_code_by_name.get(class1, FALLBACK_CLASS_CODE)
+    c2_enc = class_code_by_name.get(class2, FALLBACK_CLASS_CODE)
     return c1_enc, c2_enc
 
 def predict_pair_severity(drug1_id: str, drug2_id: str):
-    class1 = get_drug_class(drug1_id)
-    class2 = get_drug_class(drug2_id)
+    severity_labels, y_prob = predict_pairs_severity([(drug1_id, drug2_id)])
+    return severity_labels[0], y_prob[0]
 
-    c1_enc, c2_enc = encode_classes(class1, class2)
+def score_pairs_uncached(pairs):
+    """
+    Score a list of (drug1_id, drug2_id) with the configured pair scorer,
+    without the pair cache.
+    Returns (severity_labels, probabilities).
+    """
+    if not pairs:
+        return [], []
+    return app_state.get("pair_scorer").score_pairs(pairs)
+
+def predict_pairs_severity(pairs):
+    """
+    Batch version of predict_pair_severity for a list of (drug1_id, drug2_id).
+    Pairs already in the cache are answered from it; the rest are scored in
+    one score_pairs_uncached call (both orientations, so the cache can answer
+    (B, A) after seeing (A, B); only the requested one when the cache is off).
+    Returns (severity_labels, probabilities).
+    """
+    if not pairs:
+        return [], []
+
+    pair_cache = app_state.get("pair_cache")
+    version = current_pair_scorer().version
+    results = pair_cache.get_many(pairs, version)
+
+    if PAIR_CACHE_SIZE <= 0:
+        # nothing is kept, so score only the orientations asked for
+        missing = list(dict.fromkeys(p for p, r in zip(pairs, results) if r is None))
+        if missing:
+            labels, probs = score_pairs_uncached(missing)
+            scored = {p: (labels[k], probs[k]) for k, p in enumerate(missing)}
+            results = [scored[p] if r is None else r for p, r in zip(pairs, results)]
+    else:
+        missing = list(dict.fromkeys(
+            pair_key(d1, d2) for (d1, d2), r in zip(pairs, results) if r is None
+        ))
+        if missing:
+            to_score = [(lo, hi) for lo, hi in missing] + [(hi, lo) for lo, hi in missing]
+            labels, probs = score_pairs_uncached(to_score)
+            n = len(missing)
+            scored = {}
+            items = []
+            for k, key in enumerate(missing):
+                forward = (labels[k], probs[k])
+                reverse = (labels[n + k], probs[n + k])
+                scored[key] = (forward, reverse)
+                items.append((key, forward, reverse))
+            pair_cache.put_many(items, version)
+
+            for k, (d1, d2) in enumerate(pairs):
+                if results[k] is None:
+                    key = pair_key(d1, d2)
+                    results[k] = scored[key][0] if key[0] == d1 else scored[key][1]
 
-    X = pd.DataFrame([[c1_enc, c2_enc]], columns=["class1_enc", "class2_enc"])
-    y_pred = model.predict(X)[0]
-    y_prob = model.predict_proba(X)[0]
+    severity_labels = [label for label, _ in results]
+    y_prob = np.vstack([prob for _, prob in results])
+    return severity_labels, y_prob
 
-    severity_label = severity_encoder.inverse_transform([y_pred])[0]
-    return severity_label, y_prob
+def pair_cache_stats():
+    """Hit/miss/eviction counters of the pair cache, for sizing it."""
+    return app_state.get("pair_cache").stats()
 
 def compute_regimen_risk(drug_ids, age: int | None = None, sex: str | None = None):
     """
@@ -43,43 +263,72 @@ def compute_regimen_risk(drug_ids, age: int | None = None, sex: str | None = Non
     Optionally personalize score based on age and sex.
     """
     pairs = list(itertools.combinations(drug_ids, 2))
-    if not pairs:
-        return {
-            "risk_score": 0,
-            "total_pairs": 0,
-            "severe_pairs": 0,
-            "moderate_pairs": 0,
-            "unknown_pairs": 0,
-            "details": []
-        }
+    severity_labels, _ = predict_pairs_severity(pairs)
+    return regimen_risk_result(pairs, severity_labels, age, sex)
+
+def compute_regimens_risk(regimens):
+    """
+    Batch version of compute_regimen_risk for many regimens, each a dict
+    like the API's RiskRequest: {"drug_ids": [...], "age": ..., "sex": ...}.
+    Every distinct drug pair across all regimens is scored once, in one
+    predict_pairs_severity call. Returns one result per regimen, in order.
+    """
+    regimen_pairs = [list(itertools.combinations(r["drug_ids"], 2)) for r in regimens]
+
+    unique_pairs = list(dict.fromkeys(p for pairs in regimen_pairs for p in pairs))
+    unique_labels, _ = predict_pairs_severity(unique_pairs)
+    label_by_pair = dict(zip(unique_pairs, unique_labels))
+
+    return [
+        regimen_risk_result(
+            pairs, [label_by_pair[p] for p in pairs], r.get("age"), r.get("sex")
+        )
+        for r, pairs in zip(regimens, regimen_pairs)
+    ]
+
+def regimen_risk_result(pairs, severity_labels, age=None, sex=None):
+    """compute_regimen_risk's result dict from already scored pairs."""
+    details = [
+        {"drug1_id": d1, "drug2_id": d2, "severity": str(severity_label)}
+        for (d1, d2), severity_label in zip(pairs, severity_labels)
+    ]
+    severe_count, moderate_count, unknown_count = count_severities(severity_labels)
 
+    return {
+        "risk_score": risk_score_from_counts(severe_count, moderate_count, unknown_count, age, sex),
+        "total_pairs": len(pairs),
+        "severe_pairs": severe_count,
+        "moderate_pairs": moderate_count,
+        "unknown_pairs": unknown_count,
+        "details": details
+    }
+
+def count_severities(severity_labels):
+    """(severe, moderate, unknown) counts for a list of severity labels."""
     severe_count = 0
     moderate_count = 0
     unknown_count = 0
-    details = []
-
-    for d1, d2 in pairs:
-        severity_label, _ = predict_pair_severity(d1, d2)
+    for severity_label in severity_labels:
         sev_lower = str(severity_label).lower()
-        details.append({
-            "drug1_id": d1,
-            "drug2_id": d2,
-            "severity": str(severity_label)
-        })
-
         if "severe" in sev_lower:
             severe_count += 1
         elif "moderate" in sev_lower:
             moderate_count += 1
         else:
             unknown_count += 1
+    return severe_count, moderate_count, unknown_count
 
-    total_pairs = len(pairs)
+def risk_score_from_counts(severe_count, moderate_count, unknown_count,
+                           age: int | None = None, sex: str | None = None):
+    """Risk score (0-100, 2 decimals) from pair severity counts."""
+    total_pairs = severe_count + moderate_count + unknown_count
+    if total_pairs == 0:
+        return 0
 
     # Base risk score from interactions
     max_points = total_pairs * 3.0
     actual_points = severe_count * 3 + moderate_count * 2 + unknown_count * 1
-    risk_score = (actual_points / max_points) * 100 if max_points > 0 else 0
+    risk_score = (actual_points / max_points) * 100
 
     # Simple personalization tuning
     if age is not None:
@@ -99,15 +348,7 @@ def compute_regimen_risk(drug_ids, age: int | None = None, sex: str | None = Non
 
     # Cap at 100
     risk_score = min(risk_score, 100.0)
-
-    return {
-        "risk_score": round(risk_score, 2),
-        "total_pairs": total_pairs,
-        "severe_pairs": severe_count,
-        "moderate_pairs": moderate_count,
-        "unknown_pairs": unknown_count,
-        "details": details
-    }
+    return round(risk_score, 2)
 
 if __name__ == "__main__":
     # quick test if you want
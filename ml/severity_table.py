@@ -0,0 +1,133 @@
+import os
+import numpy as np
+import pandas as pd
+import joblib
+from table_store import DATA_DIR
+
+# The RF model only sees (class1_enc, class2_enc), so it can only ever produce
+# K*K different answers (K = number of encoded classes). This module evaluates
+# the forest once over every class pair and stores the results in dense arrays,
+# so serving a pair is just an array lookup.
+
+MODEL_FILE = os.path.join(DATA_DIR, "rf_interaction_model.joblib")
+CLASS_ENCODER_FILE = os.path.join(DATA_DIR, "class_encoder.joblib")
+SEVERITY_ENCODER_FILE = os.path.join(DATA_DIR, "severity_encoder.joblib")
+SEVERITY_TABLE_FILE = os.path.join(DATA_DIR, "severity_table.npz")
+
+BLOCK_ROWS = 256  # class1 values evaluated per predict_proba call
+
+
+class SeverityTable:
+    """
+    label_codes[c1, c2] -> index into severity_labels
+    probs[c1, c2]       -> predict_proba row for the pair
+    """
+
+    def __init__(self, label_codes, probs, severity_labels):
+        self.label_codes = label_codes
+        self.probs = probs
+        self.severity_labels = severity_labels
+
+    @property
+    def n_classes(self):
+        return self.label_codes.shape[0]
+
+    def lookup(self, c1_enc, c2_enc):
+        """Works for scalars and for NumPy arrays of codes."""
+        labels = self.severity_labels[self.label_codes[c1_enc, c2_enc]]
+        return labels, self.probs[c1_enc, c2_enc]
+
+
+def _class_pair_block(start, stop, n_classes):
+    c1 = np.repeat(np.arange(start, stop), n_classes)
+    c2 = np.tile(np.arange(n_classes), stop - start)
+    return pd.DataFrame({"class1_enc": c1, "class2_enc": c2})
+
+
+def build_severity_table(model, n_classes, severity_encoder):
+    n_outputs = len(model.classes_)
+    probs = np.empty((n_classes, n_classes, n_outputs), dtype=np.float64)
+
+    for start in range(0, n_classes, BLOCK_ROWS):
+        stop = min(start + BLOCK_ROWS, n_classes)
+        X = _class_pair_block(start, stop, n_classes)
+        probs[start:stop] = model.predict_proba(X).reshape(stop - start, n_classes, n_outputs)
+
+    # model.classes_ holds severity_encoder codes; argmax is what predict() does
+    label_codes = model.classes_.take(probs.argmax(axis=2)).astype(np.int32)
+    severity_labels = np.asarray(severity_encoder.classes_, dtype=str)
+    return SeverityTable(label_codes, probs, severity_labels)
+
+
+def check_severity_table(table, model, severity_encoder, n_samples=1000, seed=42):
+    """
+    Compare the table against the live model:
+      - labels for every class pair against model.predict
+      - probabilities for a random sample of pairs against one-row
+        predict_proba calls (the way predict_pair_severity used to call it)
+    Returns the number of mismatching entries (0 means the table is exact).
+    """
+    n_classes = table.n_classes
+    mismatches = 0
+
+    for start in range(0, n_classes, BLOCK_ROWS):
+        stop = min(start + BLOCK_ROWS, n_classes)
+        X = _class_pair_block(start, stop, n_classes)
+        expected = severity_encoder.inverse_transform(model.predict(X))
+        got, _ = table.lookup(X["class1_enc"].to_numpy(), X["class2_enc"].to_numpy())
+        mismatches += int((expected != got).sum())
+
+    rng = np.random.default_rng(seed)
+    n_samples = min(n_samples, n_classes * n_classes)
+    for c1, c2 in rng.integers(0, n_classes, size=(n_samples, 2)):
+        X = pd.DataFrame([[c1, c2]], columns=["class1_enc", "class2_enc"])
+        expected = model.predict_proba(X)[0]
+        if not np.array_equal(expected, table.probs[c1, c2]):
+            mismatches += 1
+
+    return mismatches
+
+
+def save_severity_table(table, path=SEVERITY_TABLE_FILE):
+    np.savez(
+        path,
+        label_codes=table.label_codes,
+        probs=table.probs,
+        severity_labels=table.severity_labels,
+    )
+
+
+def load_severity_table(path=SEVERITY_TABLE_FILE):
+    saved = np.load(path, allow_pickle=False)
+    return SeverityTable(saved["label_codes"], saved["probs"], saved["severity_labels"])
+
+
+def severity_table_is_current(path=SEVERITY_TABLE_FILE, model_path=MODEL_FILE):
+    """The table is only valid if it was built after the model was last saved."""
+    if not os.path.exists(path):
+        return False
+    if not os.path.exists(model_path):
+        return True
+    return os.path.getmtime(path) >= os.path.getmtime(model_path)
+
+
+def main():
+    model = joblib.load(MODEL_FILE)
+    class_encoder = joblib.load(CLASS_ENCODER_FILE)
+    severity_encoder = joblib.load(SEVERITY_ENCODER_FILE)
+
+    n_classes = len(class_encoder.classes_)
+    print(f"Building severity table for {n_classes} x {n_classes} class pairs...")
+    table = build_severity_table(model, n_classes, severity_encoder)
+
+    mismatches = check_severity_table(table, model, severity_encoder)
+    if mismatches:
+        raise Exception(f"Severity table does not match the model ({mismatches} mismatches)")
+    print("Consistency check passed: table matches live model predictions.")
+
+    save_severity_table(table)
+    print(f"Saved severity table to {SEVERITY_TABLE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
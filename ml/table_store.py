@@ -0,0 +1,125 @@
+import os
+import sys
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (needed by pandas for Parquet)
+except ImportError:
+    pyarrow = None
+
+# Storage for the processed knowledge-graph tables in ../data_processed/
+# (or DDI_DATA_DIR).
+#
+# Tables are written as compressed Parquet files (typed, columnar, with the
+# repeated id/class columns stored as categoricals) so each consumer can read
+# just the columns it needs. CSV stays available: set DDI_TABLE_FORMAT=csv to
+# write CSV directly, or run `python table_store.py export <table>...` to
+# export Parquet tables to CSV. Without pyarrow everything falls back to CSV.
+
+DATA_DIR = os.environ.get("DDI_DATA_DIR", "../data_processed")
+TABLE_FORMAT = os.environ.get("DDI_TABLE_FORMAT", "parquet").lower()
+PARQUET_COMPRESSION = "zstd"
+
+# Columns with many repeated values, stored as pandas categoricals
+CATEGORICAL_COLUMNS = {
+    "drugs": ["type", "drug_class"],
+    "kg_drugs": ["type", "drug_class"],
+    "known_interactions": ["drug1_id", "drug2_id", "severity", "source"],
+    "kg_interactions": ["drug1_id", "drug2_id", "severity", "source"],
+    "training_data": ["drug1_id", "class1", "drug2_id", "class2", "severity"],
+    "faers_pairs": ["drug_name_1", "drug_name_2"],
+    "faers_drug_stats": [],
+    "graph_stats": [],
+    "drug_names": ["drug_id", "source"],
+}
+
+TABLES = list(CATEGORICAL_COLUMNS)
+
+
+def table_path(name, fmt):
+    return os.path.join(DATA_DIR, f"{name}.{fmt}")
+
+
+def _use_parquet(fmt):
+    if fmt != "parquet":
+        return False
+    if pyarrow is None:
+        print("pyarrow is not installed; falling back to CSV tables.")
+        return False
+    return True
+
+
+def write_table(df, name, fmt=None):
+    """Write a table in the configured format. Returns the path written."""
+    fmt = (fmt or TABLE_FORMAT).lower()
+    if not _use_parquet(fmt):
+        path = table_path(name, "csv")
+        df.to_csv(path, index=False)
+        return path
+
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS.get(name, []):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    path = table_path(name, "parquet")
+    df.to_parquet(path, index=False, compression=PARQUET_COMPRESSION)
+    return path
+
+
+def read_table(name, columns=None):
+    """
+    Read a table, optionally only some columns. Uses whichever of the Parquet
+    and CSV files was written most recently, so a CSV regenerated by an older
+    script is never shadowed by a stale Parquet file.
+    """
+    parquet_file = table_path(name, "parquet")
+    csv_file = table_path(name, "csv")
+
+    use_parquet = pyarrow is not None and os.path.exists(parquet_file)
+    if use_parquet and os.path.exists(csv_file):
+        use_parquet = os.path.getmtime(parquet_file) >= os.path.getmtime(csv_file)
+
+    if use_parquet:
+        return pd.read_parquet(parquet_file, columns=columns)
+    return pd.read_csv(csv_file, usecols=columns)
+
+
+def table_mtime(name):
+    """Modification time of the stored table (either format), or None."""
+    mtimes = [
+        os.path.getmtime(table_path(name, fmt))
+        for fmt in ("parquet", "csv")
+        if os.path.exists(table_path(name, fmt))
+    ]
+    return max(mtimes) if mtimes else None
+
+
+def export_csv(name):
+    """Export a stored table to CSV (e.g. for spreadsheets or Neo4j import)."""
+    df = read_table(name)
+    path = table_path(name, "csv")
+    df.to_csv(path, index=False)
+    parquet_file = table_path(name, "parquet")
+    if os.path.exists(parquet_file):
+        # keep the Parquet file as the preferred source for read_table
+        mtime = os.path.getmtime(parquet_file)
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != "export":
+        print("Usage: python table_store.py export [table ...]")
+        print("Tables:", ", ".join(TABLES))
+        return
+
+    names = sys.argv[2:] or TABLES
+    for name in names:
+        if not (os.path.exists(table_path(name, "parquet")) or os.path.exists(table_path(name, "csv"))):
+            print(f"Skipping {name}: no stored table found")
+            continue
+        print(f"Exported {export_csv(name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,25 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from torch_geometric.nn import GCNConv
-from torch_geometric.utils import train_test_split_edges
 from sklearn.metrics import classification_report
+import os
 import time
+import resource
+from gnn_sampling import LayerwisePropagator, LinkNeighborSampler
+from gnn_inference import EXPORT_DTYPE, GNN_DECODER_FILE, GNN_EMBEDDINGS_FILE, export_gnn_artifacts
+
+# Training mode: "full" runs the GCN over the whole graph every epoch;
+# "minibatch" trains on sampled neighbourhoods of BATCH_SIZE target edges
+# (see gnn_sampling.py), so memory no longer grows with the whole edge set;
+# evaluation and the embedding export then run the GCN layer by layer over
+# INFERENCE_BLOCK destination nodes at a time instead of one full-graph pass.
+TRAIN_MODE = os.environ.get("DDI_GNN_MODE", "full")
+HIDDEN_CHANNELS = int(os.environ.get("DDI_GNN_HIDDEN", 32))
+EPOCHS = int(os.environ.get("DDI_GNN_EPOCHS", 60))
+BATCH_SIZE = int(os.environ.get("DDI_GNN_BATCH_SIZE", 1024))
+FAN_OUT = [int(k) for k in os.environ.get("DDI_GNN_FAN_OUT", "10,10").split(",")]  # per GCN layer
+NUM_WORKERS = int(os.environ.get("DDI_GNN_WORKERS", 0))  # DataLoader sampling workers
+INFERENCE_BLOCK = int(os.environ.get("DDI_GNN_INFERENCE_BLOCK", 65536))  # nodes per layer-wise step
 
 # Load data
 saved = torch.load("../data_processed/gnn_data.pt", weights_only=False)
@@ -33,6 +49,12 @@ class GCNLinkPredictor(nn.Module):
         h = self.conv2(h, edge_index)
         return h
 
+    @torch.no_grad()
+    def encode_layerwise(self, x, propagator):
+        """encode() with full neighbourhoods, one layer and node block at a time."""
+        h = F.relu(propagator.conv(self.conv1, x.float()))
+        return propagator.conv(self.conv2, h)
+
     def decode(self, z, edge_index_pairs):
         # z: [N, hidden], edge_index_pairs: [2, E]
         z_i = z[edge_index_pairs[0]]  # [E, hidden]
@@ -40,7 +62,7 @@ class GCNLinkPredictor(nn.Module):
         z_cat = torch.cat([z_i, z_j], dim=-1)  # [E, 2*hidden]
         return self.lin(z_cat)  # logits [E, 2]
 
-model = GCNLinkPredictor(in_channels=data.x.size(1), hidden_channels=32).to(device)
+model = GCNLinkPredictor(in_channels=data.x.size(1), hidden_channels=HIDDEN_CHANNELS).to(device)
 optimizer = torch.optim.Adam(model.parameters(), lr=0.01, weight_decay=5e-4)
 # Class weights: penalize mistakes on positive class more
 class_weights = torch.tensor([1.0, 3.0], device=device)  # [w0, w1]
@@ -71,42 +93,95 @@ def train():
     optimizer.step()
     return loss.item()
 
+def train_minibatch(loader):
+    model.train()
+    total_loss = 0.0
+    for batch in loader:
+        batch = batch.to(device)
+        optimizer.zero_grad()
+        z = model.encode(data.x[batch.nodes], batch.edge_index)
+        out = model.decode(z, batch.pair_index)
+        loss = F.cross_entropy(out, batch.y, weight=class_weights)
+        loss.backward()
+        optimizer.step()
+        total_loss += loss.item() * batch.y.size(0)
+    return total_loss / y_train.size(0)
+
+def peak_memory_mb():
+    """Peak RSS of this process and its (sampling worker) children."""
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    kb += resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    mb = kb / 1024
+    if device.type == "cuda":
+        mb = max(mb, torch.cuda.max_memory_allocated() / 1024 / 1024)
+    return mb
+
 @torch.no_grad()
-def test():
+def encode_all():
+    """Node embeddings of the whole graph for evaluation and export."""
+    model.eval()
+    if TRAIN_MODE == "minibatch":
+        return model.encode_layerwise(data.x, LayerwisePropagator(data.edge_index, num_nodes, INFERENCE_BLOCK))
+    return model.encode(data.x, data.edge_index)
+
+@torch.no_grad()
+def test(z):
     model.eval()
-    z = model.encode(data.x, data.edge_index)
     out = model.decode(z, edge_index_test)
     preds = out.argmax(dim=-1)
     report = classification_report(y_test.cpu(), preds.cpu(), output_dict=False)
     return report
 
 # Training loop
-for epoch in range(1, 61):
-    loss = train()
+if TRAIN_MODE == "minibatch":
+    sampler = LinkNeighborSampler(data.edge_index, num_nodes, FAN_OUT, edge_index_train, y_train)
+    train_loader = sampler.loader(BATCH_SIZE, num_workers=NUM_WORKERS)
+    print(f"Mini-batch training: batch size {BATCH_SIZE}, fan-out {FAN_OUT}, {NUM_WORKERS} workers")
+elif TRAIN_MODE != "full":
+    raise Exception(f"Unknown DDI_GNN_MODE {TRAIN_MODE!r} (use 'full' or 'minibatch')")
+
+peak_before_training = peak_memory_mb()
+epoch_seconds = []
+for epoch in range(1, EPOCHS + 1):
+    start = time.perf_counter()
+    loss = train_minibatch(train_loader) if TRAIN_MODE == "minibatch" else train()
+    epoch_seconds.append(time.perf_counter() - start)
     if epoch % 5 == 0 or epoch == 1:
-        print(f"Epoch {epoch}, Loss {loss:.4f}")
+        print(f"Epoch {epoch}, Loss {loss:.4f}, {epoch_seconds[-1]:.2f}s")
+
+print(f"\nMode: {TRAIN_MODE}, hidden size {HIDDEN_CHANNELS}")
+print(f"Time per epoch: {sum(epoch_seconds) / len(epoch_seconds):.3f}s (avg), {max(epoch_seconds):.3f}s (max)")
+print(f"Peak memory: {peak_memory_mb():.1f} MB ({peak_before_training:.1f} MB before training)")
 
 
+z = encode_all()  # computed once, reused for evaluation, timing and export
+
 print("\n=== GNN Evaluation on Test Set ===")
-report = test()
+report = test(z)
 print(report)
 
 # Measure inference time for, say, 1000 edges
 @torch.no_grad()
-def measure_inference_time(num_samples=1000):
+def measure_inference_time(z, num_samples=1000):
     model.eval()
-    z = model.encode(data.x, data.edge_index)
     # Sample subset of test edges (or reuse full)
     e = min(num_samples, edge_index_test.size(1))
     subset = edge_index_test[:, :e]
     start = time.time()
-    out = model.decode(z, subset)
+    model.decode(z, subset)
     end = time.time()
     avg_time_per_edge = (end - start) / e
     print(f"Inference time per edge: {avg_time_per_edge*1000:.4f} ms")
 
-measure_inference_time()
+measure_inference_time(z)
+print(f"Peak memory after evaluation: {peak_memory_mb():.1f} MB")
 
 # Save model
 torch.save(model.state_dict(), "../data_processed/gnn_ddi_model.pt")
 print("Saved GNN model to ../data_processed/gnn_ddi_model.pt")
+
+# Export embeddings + decoder weights for NumPy-only serving (gnn_inference.py)
+export_gnn_artifacts(
+    z.cpu().numpy(), model.lin.weight.detach().cpu().numpy(), model.lin.bias.detach().cpu().numpy()
+)
+print(f"Saved GNN embeddings ({EXPORT_DTYPE}) to {GNN_EMBEDDINGS_FILE} and decoder to {GNN_DECODER_FILE}")
@@ -1,46 +1,170 @@
+import os
+import time
+import pickle
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
 from sklearn.metrics import classification_report, confusion_matrix
 import joblib
+from table_store import DATA_DIR, read_table
+from severity_table import (
+    CLASS_ENCODER_FILE,
+    MODEL_FILE,
+    SEVERITY_ENCODER_FILE,
+    build_severity_table,
+    check_severity_table,
+    save_severity_table,
+)
+
+# Model settings:
+#   DDI_MODEL_KIND        "rf" (RandomForest, default) or "hgb"
+#                         (HistGradientBoosting: fewer, shallower trees,
+#                         much cheaper predict_proba)
+#   DDI_MODEL_MAX_DEPTH   cap the RandomForest tree depth (compact model)
+#   DDI_TRAIN_N_JOBS      cores used by the RandomForest (-1 = all)
+#   DDI_TRAIN_INCREMENTAL "1": reuse the saved model and encoders and only
+#                         add DDI_TRAIN_ADD_TREES trees (warm_start) when
+#                         training_data has new rows; nothing is retrained if
+#                         it has not changed. Falls back to a full fit when
+#                         new classes or severities appear, the settings
+#                         differ from the saved model, or adding trees would
+#                         go past DDI_TRAIN_MAX_TREES.
+#   DDI_TRAIN_MAX_TREES   cap on trees / iterations an incremental run may
+#                         grow the model to (default 2 * N_ESTIMATORS)
+MODEL_KIND = os.environ.get("DDI_MODEL_KIND", "rf")
+MAX_DEPTH = int(os.environ["DDI_MODEL_MAX_DEPTH"]) if os.environ.get("DDI_MODEL_MAX_DEPTH") else None
+N_JOBS = int(os.environ.get("DDI_TRAIN_N_JOBS", -1))
+INCREMENTAL = os.environ.get("DDI_TRAIN_INCREMENTAL", "0") == "1"
+ADD_TREES = int(os.environ.get("DDI_TRAIN_ADD_TREES", 50))
+
+N_ESTIMATORS = 200  # RandomForest trees / HistGradientBoosting iterations
+MAX_TREES = int(os.environ.get("DDI_TRAIN_MAX_TREES", 2 * N_ESTIMATORS))
+TRAINING_MANIFEST_FILE = os.path.join(DATA_DIR, "training_manifest.joblib")
+
+stage_seconds = {}
+_stage_start = time.perf_counter()
+
+def end_stage(name):
+    """Record the time since the previous stage ended."""
+    global _stage_start
+    now = time.perf_counter()
+    stage_seconds[name] = now - _stage_start
+    _stage_start = now
+
+def new_model():
+    if MODEL_KIND == "rf":
+        return RandomForestClassifier(
+            n_estimators=N_ESTIMATORS,
+            max_depth=MAX_DEPTH,
+            random_state=42,
+            n_jobs=N_JOBS,
+        )
+    if MODEL_KIND == "hgb":
+        return HistGradientBoostingClassifier(
+            max_iter=N_ESTIMATORS,
+            max_depth=MAX_DEPTH,
+            early_stopping=False,
+            random_state=42,
+        )
+    raise Exception(f"Unknown DDI_MODEL_KIND {MODEL_KIND!r} (use 'rf' or 'hgb')")
+
+def model_settings():
+    return {"kind": MODEL_KIND, "max_depth": MAX_DEPTH}
+
+def row_hashes(df):
+    return np.sort(pd.util.hash_pandas_object(df, index=False).to_numpy())
+
+def load_previous():
+    """(model, class_encoder, severity_encoder, manifest) of the last run, or None."""
+    paths = [MODEL_FILE, CLASS_ENCODER_FILE, SEVERITY_ENCODER_FILE, TRAINING_MANIFEST_FILE]
+    if not all(os.path.exists(p) for p in paths):
+        return None
+    return tuple(joblib.load(p) for p in paths)
+
+def model_trees(model):
+    return len(model.estimators_) if MODEL_KIND == "rf" else model.n_iter_
+
+def model_nodes(model):
+    if MODEL_KIND == "rf":
+        return sum(tree.tree_.node_count for tree in model.estimators_)
+    return sum(len(p.nodes) for iteration in model._predictors for p in iteration)
 
 # 1) LOAD TRAINING DATA
-df = pd.read_csv("../data_processed/training_data.csv")
+df = read_table("training_data", columns=["class1", "class2", "severity"])
 print("Original rows:", len(df))
 
 # 2) DROP ROWS WITH MISSING VALUES IN KEY COLUMNS
 df = df.dropna(subset=["class1", "class2", "severity"])
+df = df.astype(str)
 print("Rows after dropping NA:", len(df))
+hashes = row_hashes(df)
+end_stage("load")
 
 # 3) ENCODE TEXT LABELS AS NUMBERS
-class_encoder = LabelEncoder()
-severity_encoder = LabelEncoder()
+# One class encoder for both columns (fit on class1 ∪ class2), so a class
+# has the same code whichever side of the pair it is on
+previous = load_previous() if INCREMENTAL else None
+model = None
+if previous is not None:
+    model, class_encoder, severity_encoder, manifest = previous
+    new_classes = set(df["class1"]).union(df["class2"]).difference(class_encoder.classes_)
+    new_severities = set(df["severity"]).difference(severity_encoder.classes_)
+    if manifest.get("settings") != model_settings():
+        print("Model settings changed; retraining from scratch.")
+        model = None
+    elif new_classes or new_severities:
+        print(f"{len(new_classes)} new classes / {len(new_severities)} new severities; retraining from scratch.")
+        model = None
+    elif np.array_equal(manifest["row_hashes"], hashes):
+        print("training_data is unchanged since the saved model; nothing to retrain.")
+        raise SystemExit(0)
+    elif model_trees(model) + ADD_TREES > MAX_TREES:
+        print(f"Model already has {model_trees(model)} trees (DDI_TRAIN_MAX_TREES={MAX_TREES}); "
+              "retraining from scratch.")
+        model = None
+    else:
+        new_rows = len(np.setdiff1d(hashes, manifest["row_hashes"]))
+        print(f"{new_rows} distinct new rows; adding trees to the saved model.")
+
+if model is None:
+    class_encoder = LabelEncoder().fit(pd.concat([df["class1"], df["class2"]]))
+    severity_encoder = LabelEncoder().fit(df["severity"])
 
-df["class1_enc"] = class_encoder.fit_transform(df["class1"].astype(str))
-df["class2_enc"] = class_encoder.fit_transform(df["class2"].astype(str))
-df["severity_enc"] = severity_encoder.fit_transform(df["severity"].astype(str))
+df["class1_enc"] = class_encoder.transform(df["class1"])
+df["class2_enc"] = class_encoder.transform(df["class2"])
+df["severity_enc"] = severity_encoder.transform(df["severity"])
 
 X = df[["class1_enc", "class2_enc"]]
 y = df["severity_enc"]
 
 # 4) TRAIN / TEST SPLIT
+# (in incremental runs the test rows may have been seen by the older trees)
 X_train, X_test, y_train, y_test = train_test_split(
     X, y, test_size=0.2, random_state=42, stratify=y
 )
 
 print("Train size:", len(X_train), "Test size:", len(X_test))
+end_stage("encode + split")
 
-# 5) TRAIN RANDOM FOREST MODEL
-model = RandomForestClassifier(
-    n_estimators=200,
-    max_depth=None,
-    random_state=42,
-)
+# 5) TRAIN MODEL
+if model is None:
+    model = new_model()
+elif MODEL_KIND == "rf":
+    model.set_params(warm_start=True, n_estimators=model_trees(model) + ADD_TREES, n_jobs=N_JOBS)
+else:
+    model.set_params(warm_start=True, max_iter=model_trees(model) + ADD_TREES)
 model.fit(X_train, y_train)
+if MODEL_KIND == "rf":
+    # all cores for fitting; predictions are single-row calls in the API
+    # (parallelized across scoring workers), where n_jobs=-1 only adds overhead
+    model.set_params(n_jobs=1)
+end_stage("fit")
 
 # 6) EVALUATION
 y_pred = model.predict(X_test)
+end_stage("predict test set")
 
 print("\n=== Classification Report ===")
 print(classification_report(y_test, y_pred))
@@ -49,7 +173,28 @@ print("\n=== Confusion Matrix ===")
 print(confusion_matrix(y_test, y_pred))
 
 # 7) SAVE MODEL & ENCODERS FOR LATER USE
-joblib.dump(model, "../data_processed/rf_interaction_model.joblib")
-joblib.dump(class_encoder, "../data_processed/class_encoder.joblib")
-joblib.dump(severity_encoder, "../data_processed/severity_encoder.joblib")
+joblib.dump(model, MODEL_FILE)
+joblib.dump(class_encoder, CLASS_ENCODER_FILE)
+joblib.dump(severity_encoder, SEVERITY_ENCODER_FILE)
+joblib.dump({"settings": model_settings(), "row_hashes": hashes}, TRAINING_MANIFEST_FILE)
 print("\nSaved model and encoders to data_processed/")
+end_stage("save")
+
+# 8) PRECOMPUTE CLASS-PAIR SEVERITY TABLE (used by risk_scoring instead of the model)
+n_classes = len(class_encoder.classes_)
+table = build_severity_table(model, n_classes, severity_encoder)
+mismatches = check_severity_table(table, model, severity_encoder)
+if mismatches:
+    raise Exception(f"Severity table does not match the model ({mismatches} mismatches)")
+save_severity_table(table)
+print(f"Saved {n_classes} x {n_classes} severity table to data_processed/severity_table.npz")
+end_stage("severity table")
+
+# 9) REPORT
+print(f"\nModel: {type(model).__name__}, {model_nodes(model)} tree nodes")
+print(f"Model size: {os.path.getsize(MODEL_FILE) / 1024 / 1024:.2f} MB on disk, "
+      f"{len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 1024 / 1024:.2f} MB in memory")
+print(f"Test-set inference: {stage_seconds['predict test set'] / len(X_test) * 1e6:.1f} us/row")
+print("Stage timings:")
+for name, seconds in stage_seconds.items():
+    print(f"  {name:<18} {seconds:.2f}s")
@@ -1,46 +1,19 @@
-import pandas as pd
-from risk_scoring import predict_pair_severity
+from table_store import read_table
+from validation_engine import report_timing, validate_fda
 
 # Load training data (contains FDA severity labels)
-df = pd.read_csv("../data_processed/training_data.csv")
+df = read_table("training_data", columns=["drug1_id", "drug2_id", "severity"])
 
-# Only keep necessary columns and drop missing values
-df = df.dropna(subset=["drug1_id", "drug2_id", "severity"])
-
-total = 0
-correct = 0
-details = []
-
-for _, row in df.iterrows():
-    d1 = row["drug1_id"]
-    d2 = row["drug2_id"]
-    true_label = str(row["severity"]).lower()
-    
-    predicted_label, _ = predict_pair_severity(d1, d2)
-    predicted_label = str(predicted_label).lower()
-
-    # Count as match if predicted severity category matches true label
-    match = (predicted_label in true_label) or (true_label in predicted_label)
-    
-    total += 1
-    if match:
-        correct += 1
-    
-    details.append({
-        "drug1": d1,
-        "drug2": d2,
-        "true_severity": true_label,
-        "predicted_severity": predicted_label,
-        "match": match
-    })
-
-accuracy = correct / total * 100
+# Match if the predicted severity category is contained in the true label
+# (or the other way round); scored in batches, see validation_engine.py
+details, metrics = validate_fda(df)
 
 print("=== FDA-Documented Drug Interaction Validation ===")
-print(f"Total evaluated pairs: {total}")
-print(f"Correct predictions: {correct}")
-print(f"Accuracy: {accuracy:.2f}%")
+print(f"Total evaluated pairs: {metrics['total']}")
+print(f"Correct predictions: {metrics['correct']}")
+print(f"Accuracy: {metrics['accuracy']:.2f}%")
+report_timing("Validation", metrics["total"], metrics["seconds"])
 
 # Save detailed result table
-pd.DataFrame(details).to_csv("../data_processed/fda_validation_details.csv", index=False)
+details.to_csv("../data_processed/fda_validation_details.csv", index=False)
 print("Saved detailed results to ../data_processed/fda_validation_details.csv")
@@ -0,0 +1,138 @@
+import os
+import time
+import multiprocessing
+import numpy as np
+import pandas as pd
+import app_state
+from name_resolver import resolve_names
+from risk_scoring import score_pairs_uncached
+
+# Shared engine for the validation scripts (validate_against_fda.py,
+# faers_pairs_validation.py).
+#
+# Instead of one predict_pair_severity call per row, the rows are reduced to
+# their distinct (drug1_id, drug2_id) pairs, those are scored in batched
+# score_pairs_uncached calls (one feature matrix / predict_proba per chunk),
+# and the labels are broadcast back to the rows. Inputs with more than
+# CHUNK_ROWS distinct pairs are split across a fork pool of WORKERS
+# processes. Labels are the forward-orientation scores, i.e. exactly what
+# predict_pair_severity(d1, d2) returns.
+
+WORKERS = int(os.environ.get("DDI_VALIDATION_WORKERS", os.cpu_count() or 1))
+CHUNK_ROWS = int(os.environ.get("DDI_VALIDATION_CHUNK_ROWS", 50_000))
+
+
+def _score_chunk(pairs):
+    labels, _ = score_pairs_uncached(pairs)
+    return labels
+
+
+def score_pair_labels(drug1_ids, drug2_ids, workers=WORKERS, chunk_rows=CHUNK_ROWS):
+    """Severity label per (drug1_ids[k], drug2_ids[k]), as an object array."""
+    keys = pd.DataFrame({"drug1_id": drug1_ids, "drug2_id": drug2_ids})
+    codes = keys.groupby(["drug1_id", "drug2_id"], sort=False, dropna=False).ngroup().to_numpy()
+    unique_pairs = list(keys.drop_duplicates().itertuples(index=False, name=None))
+    if not unique_pairs:
+        return np.empty(0, dtype=object)
+
+    chunks = [unique_pairs[i:i + chunk_rows] for i in range(0, len(unique_pairs), chunk_rows)]
+    if workers > 1 and len(chunks) > 1:
+        # the forked workers inherit the artifacts already loaded here
+        app_state.get("pair_scorer")
+        with multiprocessing.get_context("fork").Pool(min(workers, len(chunks))) as pool:
+            labels = [label for part in pool.map(_score_chunk, chunks) for label in part]
+    else:
+        labels = [label for chunk in chunks for label in _score_chunk(chunk)]
+
+    return np.asarray(labels, dtype=object)[codes]
+
+
+def substring_match(predicted, true):
+    """(p in t) or (t in p) per row, evaluated once per distinct (p, t)."""
+    rows = pd.DataFrame({"p": predicted, "t": true})
+    combos = rows.drop_duplicates()
+    combos["match"] = [(p in t) or (t in p) for p, t in zip(combos["p"], combos["t"])]
+    return rows.merge(combos, on=["p", "t"], how="left")["match"].to_numpy()
+
+
+def is_high_risk(severity_labels):
+    s = pd.Series(severity_labels, dtype=object).astype(str).str.lower()
+    return s.str.contains("severe|major|contraindicat|moderate", regex=True).to_numpy()
+
+
+def report_timing(name, rows, seconds):
+    rate = rows / seconds if seconds > 0 else float("inf")
+    print(f"{name}: {rows} rows in {seconds:.2f}s ({rate:,.0f} rows/sec)")
+
+
+def validate_fda(df, workers=WORKERS):
+    """
+    df: training_data rows with drug1_id, drug2_id, severity.
+    Returns (details DataFrame, metrics dict).
+    """
+    app_state.get("pair_scorer")  # artifact loading is not part of the timing
+    start = time.perf_counter()
+    df = df.dropna(subset=["drug1_id", "drug2_id", "severity"])
+
+    true_label = df["severity"].astype(str).str.lower().to_numpy()
+    predicted = score_pair_labels(df["drug1_id"].to_numpy(), df["drug2_id"].to_numpy(), workers)
+    predicted = pd.Series(predicted, dtype=object).astype(str).str.lower().to_numpy()
+    match = substring_match(predicted, true_label)
+
+    details = pd.DataFrame({
+        "drug1": df["drug1_id"].to_numpy(),
+        "drug2": df["drug2_id"].to_numpy(),
+        "true_severity": true_label,
+        "predicted_severity": predicted,
+        "match": match,
+    })
+    total = len(details)
+    correct = int(match.sum())
+    metrics = {
+        "total": total,
+        "correct": correct,
+        "accuracy": correct / total * 100 if total else float("nan"),
+        "seconds": time.perf_counter() - start,
+    }
+    return details, metrics
+
+
+def map_names_to_ids(names):
+    """DrugBank id per FAERS name (name_resolver.py), None if unmatched."""
+    ids = resolve_names(names)["drug_id"].to_numpy(dtype=object)
+    return np.where(pd.isna(ids), None, ids)
+
+
+def validate_faers_pairs(faers_pairs, min_reports, workers=WORKERS):
+    """
+    FAERS pairs with >= min_reports reports whose names map to DrugBank ids.
+    Returns (strong pair count, details DataFrame, metrics dict).
+    """
+    app_state.get("pair_scorer")  # artifact loading is not part of the timing
+    start = time.perf_counter()
+    strong_pairs = faers_pairs[faers_pairs["pair_reports"] >= min_reports]
+
+    id1 = map_names_to_ids(strong_pairs["drug_name_1"])
+    id2 = map_names_to_ids(strong_pairs["drug_name_2"])
+    mapped = np.array([bool(a) and bool(b) for a, b in zip(id1, id2)], dtype=bool)
+    evaluated = strong_pairs[mapped]
+
+    severity = score_pair_labels(id1[mapped], id2[mapped], workers)
+    high_risk = is_high_risk(severity)
+
+    details = pd.DataFrame({
+        "drug_name_1": evaluated["drug_name_1"].to_numpy(),
+        "drug_name_2": evaluated["drug_name_2"].to_numpy(),
+        "pair_reports": evaluated["pair_reports"].to_numpy(),
+        "severity_pred": severity,
+        "model_flags_high": high_risk,
+    })
+    total = len(details)
+    flagged = int(high_risk.sum())
+    metrics = {
+        "total": total,
+        "flagged": flagged,
+        "precision": flagged / total * 100 if total else float("nan"),
+        "seconds": time.perf_counter() - start,
+    }
+    return len(strong_pairs), details, metrics